@@ -0,0 +1,18 @@
+import pytest
+
+from core.query_budget import check_query_budget
+
+
+@pytest.fixture
+def query_budget():
+    return check_query_budget
+
+
+@pytest.fixture
+def seeded_feed(mixer, user, another_user, group):
+    mixer.blend('posts.Follow', user=user, author=another_user)
+    posts = mixer.cycle(25).blend(
+        'posts.Post', author=another_user, group=group, image='')
+    for post in posts[-15:]:
+        mixer.cycle(3).blend('posts.Comment', post=post, author=user)
+    return posts[-1]
@@ -0,0 +1,9 @@
+import pytest
+
+from core.testing import test_settings
+
+
+@pytest.fixture(scope='session', autouse=True)
+def project_test_settings():
+    with test_settings():
+        yield
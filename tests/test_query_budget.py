@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from core.query_budget import QueryBudgetExceeded
+from posts.models import AuthorStats, Post
+
+pytestmark = [pytest.mark.django_db]
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B'
+)
+
+
+class TestQueryBudget:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    def test_list_views_budget(self, user_client, query_budget, seeded_feed):
+        for url in (
+            '/',
+            f'/group/{seeded_feed.group.slug}/',
+            f'/profile/{seeded_feed.author.username}/',
+            '/follow/',
+            '/search/?q=test',
+            '/export/',
+        ):
+            query_budget(user_client, url)
+
+    def test_api_budget(self, user_client, query_budget, seeded_feed):
+        for url in (
+            '/api/posts/',
+            f'/api/group/{seeded_feed.group.slug}/posts/',
+            f'/api/profile/{seeded_feed.author.username}/posts/',
+            f'/api/posts/{seeded_feed.id}/',
+            f'/api/posts/{seeded_feed.id}/comments/',
+        ):
+            query_budget(user_client, url)
+
+    def test_post_detail_budget(self, user_client, query_budget, seeded_feed):
+        query_budget(user_client, f'/posts/{seeded_feed.id}/')
+
+    def test_write_views_budget(self, user_client, query_budget, seeded_feed):
+        for url in (
+            '/create/',
+            f'/posts/{seeded_feed.id}/comment/',
+            f'/profile/{seeded_feed.author.username}/unfollow/',
+            f'/profile/{seeded_feed.author.username}/follow/',
+        ):
+            query_budget(user_client, url)
+        query_budget(user_client, '/create/', {'text': 'Новый пост'},
+                     method='post')
+        query_budget(user_client, f'/posts/{seeded_feed.id}/comment/',
+                     {'text': 'Новый комментарий'}, method='post')
+
+    def test_first_post_to_followers_budget(self, user_client, user, group,
+                                            mixer, query_budget, mock_media):
+        mixer.cycle(10).blend('posts.Follow', author=user)
+        AuthorStats.objects.filter(user=user).delete()
+        image = SimpleUploadedFile('small.gif', SMALL_GIF,
+                                   content_type='image/gif')
+        query_budget(user_client, '/create/',
+                     {'text': 'Пост с картинкой', 'image': image,
+                      'group': group.id},
+                     method='post')
+        assert Post.objects.filter(author=user).exists(), (
+            'Проверьте, что пост с картинкой создаётся'
+        )
+
+    def test_query_stats_header(self, client, settings, post):
+        settings.QUERY_STATS_HEADER = True
+        response = client.get('/')
+        assert response['X-DB-Queries'].startswith('posts:index; count='), (
+            'Проверьте, что заголовок `X-DB-Queries` содержит имя view '
+            'и число запросов'
+        )
+
+    def test_over_budget_raises_when_strict(self, client, settings, post):
+        settings.QUERY_BUDGET_STRICT = True
+        settings.QUERY_BUDGETS = {'posts:index': 0}
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/')
+
+    def test_over_budget_logs_when_lenient(self, client, settings, post,
+                                           caplog):
+        settings.QUERY_BUDGET_STRICT = False
+        settings.QUERY_BUDGETS = {'posts:index': 0}
+        with caplog.at_level(logging.WARNING, logger='core.middleware'):
+            response = client.get('/')
+        assert response.status_code == 200
+        assert 'posts:index' in caplog.text, (
+            'Проверьте, что в бою превышение бюджета только логируется'
+        )
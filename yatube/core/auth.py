@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+USER_KEY = 'auth:user:{}'
+
+
+def _store():
+    # Выход и смена пароля в одном процессе должны сразу действовать
+    # во всех остальных.
+    return caches['shared']
+
+
+def _session_matches(request, user):
+    session = request.session
+    return (
+        session.get(auth.BACKEND_SESSION_KEY)
+        in settings.AUTHENTICATION_BACKENDS
+        and constant_time_compare(session.get(auth.HASH_SESSION_KEY, ''),
+                                  user.get_session_auth_hash())
+    )
+
+
+def get_cached_user(request):
+    """Как auth.get_user, но пользователь берётся из кэша.
+
+    Хэш пароля в сессии сверяется и при попадании в кэш, поэтому смена
+    пароля по-прежнему разлогинивает остальные сессии.
+    """
+    user_id = request.session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return AnonymousUser()
+    key = USER_KEY.format(user_id)
+    store = _store()
+    user = store.get(key)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            store.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+    if not _session_matches(request, user):
+        request.session.flush()
+        return AnonymousUser()
+    return user
+
+
+def forget_user(user_id):
+    _store().delete(USER_KEY.format(user_id))
@@ -0,0 +1,172 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value, '
+    'expires REAL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+ALIVE = '(expires IS NULL OR expires > ?)'
+SET_SQL = (
+    'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+    'expires = excluded.expires'
+)
+# Вставка, если ключа нет или он истёк; иначе строка не меняется.
+ADD_SQL = SET_SQL + ' WHERE cache.expires <= ?'
+INCR_SQL = (
+    f'UPDATE cache SET value = value + ? WHERE key = ? AND {ALIVE} '
+    "AND typeof(value) = 'integer'"
+)
+# Переменных в одном запросе у старых SQLite не больше 999.
+CHUNK_SIZE = 500
+
+
+def _encode(value):
+    # Числа хранятся как есть, чтобы incr шёл одним UPDATE.
+    if type(value) in (int, float):
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return pickle.loads(value)
+    return value
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в отдельном файле SQLite, общий для всех процессов сервера.
+
+    Основную базу он не трогает: у файла свой писатель. Чтение нескольких
+    ключей — один SELECT, add и incr атомарны между процессами.
+    Истёкшие записи удаляются раз в CULL_EVERY записей процесса.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        options = params.get('OPTIONS', {})
+        self.cull_every = int(options.get('CULL_EVERY', 1000))
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            apply_pragmas(connection, PRAGMAS)
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _written(self, connection):
+        self._writes += 1
+        if self._writes % self.cull_every == 0:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', [time.time()])
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        found = {}
+        for chunk in _chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, value FROM cache '
+                f'WHERE key IN ({placeholders}) AND {ALIVE}',
+                [*chunk, time.time()])
+            found.update((keys[key], _decode(value)) for key, value in rows)
+        return found
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self._key(key, version), _encode(value), expires)
+                for key, value in data.items()]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(SET_SQL, rows)
+        self._written(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection()
+        cursor = connection.execute(ADD_SQL, [
+            self._key(key, version), _encode(value),
+            self.get_backend_timeout(timeout), time.time()])
+        self._written(connection)
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            [self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()])
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            cursor = connection.execute(INCR_SQL, [delta, key, time.time()])
+            if cursor.rowcount != 1:
+                raise ValueError(f"Key '{key}' not found")
+            value, = connection.execute(
+                'SELECT value FROM cache WHERE key = ?', [key]).fetchone()
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        connection = self._connection()
+        for chunk in _chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', chunk)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут весь поток: открывать файл на каждый запрос
+        # дороже, чем держать его.
+        pass
@@ -0,0 +1,111 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Сессии, пользователи и миниатюры сразу после записи читаются снова,
+# отставание реплики для них заметно: всегда основная база.
+PRIMARY_APPS = frozenset({'auth', 'sessions', 'thumbnail'})
+
+# Служебные записи при показе страницы: счётчики, которые создаются при
+# первом чтении, сессии и миниатюры. Остальные записи, в том числе
+# подписка по GET, переводят пользователя на основную базу.
+BOOKKEEPING_MODELS = frozenset({
+    'posts.authorstats', 'sessions.session', 'thumbnail.kvstore'})
+
+
+def replica_files():
+    return {alias: connections[alias].settings_dict['NAME']
+            for alias in settings.DATABASE_REPLICAS}
+
+
+def fresh_replicas():
+    """Реплики, обновлённые не раньше REPLICA_MAX_LAG секунд назад.
+
+    refresh_replicas трогает файл после каждого копирования, поэтому
+    время изменения файла — время последнего обновления реплики.
+    """
+    oldest = time.time() - settings.REPLICA_MAX_LAG
+    fresh = []
+    for alias, name in replica_files().items():
+        try:
+            modified = os.stat(name).st_mtime
+        except OSError:
+            continue
+        if modified >= oldest:
+            fresh.append(alias)
+    return fresh
+
+
+def _atomic_depth():
+    connection = connections[DEFAULT_DB_ALIAS]
+    if not connection.in_atomic_block:
+        return 0
+    return 1 + len(connection.savepoint_ids)
+
+
+class RoutingState:
+    def __init__(self, replicas):
+        self.replicas = replicas
+        self.wrote = False
+        self._fresh = None
+        # Транзакции, открытые до запроса, не мешают читать с реплик.
+        self.depth = _atomic_depth()
+
+    def in_transaction(self):
+        return _atomic_depth() > self.depth
+
+    def fresh(self):
+        # Один stat на реплику за запрос.
+        if self._fresh is None:
+            self._fresh = fresh_replicas()
+        return self._fresh
+
+
+# Вне запроса (команды, воркеры, shell) всё читается с основной базы.
+_state = ContextVar('db_routing', default=None)
+
+
+@contextmanager
+def routing(replicas):
+    token = _state.set(RoutingState(replicas))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение с реплик, запись и всё после неё — в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.replicas or state.wrote
+            or not settings.DATABASE_REPLICAS
+            or model._meta.app_label in PRIMARY_APPS
+            or state.in_transaction()
+        ):
+            return DEFAULT_DB_ALIAS
+        fresh = state.fresh()
+        return random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if (
+            state is not None
+            and model._meta.label_lower not in BOOKKEEPING_MODELS
+        ):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
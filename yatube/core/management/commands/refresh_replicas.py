@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source_name, target_name):
+    """Согласованная копия SQLite через backup API прямо в файл реплики.
+
+    Файл не подменяется: открытые соединения реплики продолжают работать
+    и после копирования видят новые данные. Время изменения файла
+    обновляется явно — по нему роутер судит об отставании.
+    """
+    source = sqlite3.connect(source_name)
+    target = sqlite3.connect(target_name)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.utime(target_name)
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.REPLICA_REFRESH_INTERVAL,
+            help='Повторять каждые N секунд, по умолчанию '
+                 'REPLICA_REFRESH_INTERVAL')
+        parser.add_argument('--once', action='store_true',
+                            help='Обновить один раз и выйти')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Файловые реплики поддерживаются только для SQLite')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: SQLITE_REPLICAS = 0')
+        while True:
+            start = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(primary.settings_dict['NAME'],
+                              connections[alias].settings_dict['NAME'])
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(
+                f'Реплик обновлено: {len(settings.DATABASE_REPLICAS)} '
+                f'за {elapsed:.0f} мс')
+            if options['once'] or not options['interval']:
+                return
+            time.sleep(options['interval'])
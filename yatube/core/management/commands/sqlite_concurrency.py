@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import measure_concurrency
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками по умолчанию '
+        'и с SQLITE_PRODUCTION_PRAGMAS при параллельных читателях и '
+        'писателях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': {},
+            'tuned': settings.SQLITE_PRODUCTION_PRAGMAS,
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas in profiles.items():
+                results[name] = measure_concurrency(
+                    os.path.join(directory, f'{name}.sqlite3'), pragmas,
+                    options['readers'], options['writers'],
+                    options['seconds'])
+                self.stdout.write(
+                    f'{name:<8} чтений/с={results[name]["reads_per_s"]:>10} '
+                    f'записей/с={results[name]["writes_per_s"]:>8} '
+                    f'ошибок={results[name]["errors"]}')
+        for metric in ('reads_per_s', 'writes_per_s'):
+            before = results['default'][metric]
+            after = results['tuned'][metric]
+            if before:
+                self.stdout.write(f'{metric}: x{after / before:.2f}')
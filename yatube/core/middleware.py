@@ -0,0 +1,90 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import db_router
+from .auth import get_cached_user
+from .query_budget import QueryBudgetExceeded, QueryStats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_stats = stats = QueryStats()
+        with stats.record():
+            response = self.get_response(request)
+        if request.resolver_match is not None:
+            stats.view_name = request.resolver_match.view_name
+        if response.streaming:
+            # Запросы потокового ответа выполняются уже при отдаче тела.
+            response.streaming_content = self.stream(
+                stats, response.streaming_content)
+            return response
+        self.report(stats)
+        if settings.QUERY_STATS_HEADER:
+            response['X-DB-Queries'] = (
+                f'{stats.view_name}; count={stats.count}; '
+                f'time={stats.duration * 1000:.1f}ms'
+            )
+        return response
+
+    def stream(self, stats, content):
+        with stats.record():
+            yield from content
+        self.report(stats)
+
+    def report(self, stats):
+        if not stats.over_budget:
+            return
+        message = (f'{stats.view_name}: {stats.count} запросов к БД '
+                   f'при бюджете {stats.budget}')
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReadYourWritesMiddleware:
+    """Безопасные запросы читают с реплик.
+
+    После записи пользователь получает cookie и несколько секунд читает
+    с основной базы, чтобы увидеть свои изменения. Запись при GET
+    (подписка по ссылке) тоже считается, служебные записи
+    из db_router.BOOKKEEPING_MODELS — нет.
+    """
+
+    cookie_name = 'primary_db'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        replicas = safe and self.cookie_name not in request.COOKIES
+        with db_router.routing(replicas) as state:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                replicas, response.streaming_content)
+        if state.wrote:
+            response.set_cookie(
+                self.cookie_name, '1', httponly=True, samesite='Lax',
+                max_age=settings.READ_YOUR_WRITES_SECONDS)
+        return response
+
+    def stream(self, replicas, content):
+        with db_router.routing(replicas):
+            yield from content
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """request.user из кэша, без запроса к auth_user на каждый запрос."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
@@ -0,0 +1,55 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    """View превысил бюджет запросов при QUERY_BUDGET_STRICT."""
+
+
+class QueryStats:
+    """Считает запросы к БД и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.view_name = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+    def record(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def budget(self):
+        return settings.QUERY_BUDGETS.get(self.view_name)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+
+def check_query_budget(client, path, data=None, method='get', **extra):
+    response = getattr(client, method)(path, data, **extra)
+    if response.streaming:
+        response.streaming_content = [b''.join(response.streaming_content)]
+    stats = response.wsgi_request.query_stats
+    assert stats.budget is not None, (
+        f'Для `{stats.view_name}` не задан бюджет в QUERY_BUDGETS'
+    )
+    assert not stats.over_budget, (
+        f'`{stats.view_name}` выполнил {stats.count} запросов к БД '
+        f'при бюджете {stats.budget}'
+    )
+    return response
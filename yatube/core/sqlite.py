@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+import time
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL, '
+    'pub_date TEXT NOT NULL, comments_count INTEGER NOT NULL DEFAULT 0)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, created TEXT NOT NULL)',
+    'CREATE INDEX comment_post ON comment (post_id, created, id)',
+)
+READ_SQL = (
+    'SELECT id, text, comments_count FROM post '
+    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+WRITE_SQL = (
+    'BEGIN',
+    "INSERT INTO comment (post_id, text, created) "
+    "VALUES (1, 'Комментарий', datetime('now'))",
+    'UPDATE post SET comments_count = comments_count + 1 WHERE id = 1',
+    'COMMIT',
+)
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def seed(path, posts=1000):
+    connection = sqlite3.connect(path)
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            "INSERT INTO post (text, pub_date) VALUES (?, datetime('now'))",
+            ((f'Пост {i}',) for i in range(posts)),
+        )
+    connection.close()
+
+
+def _read(connection):
+    connection.execute(READ_SQL).fetchall()
+
+
+def _write(connection):
+    try:
+        for statement in WRITE_SQL:
+            connection.execute(statement)
+    except sqlite3.OperationalError:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+
+
+def _worker(path, pragmas, operation, deadline, results):
+    # Соединение в автокоммите, транзакции пишущего — явные, как в atomic.
+    connection = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(connection, pragmas)
+    done = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            operation(connection)
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    results.append((operation, done, errors))
+
+
+def measure_concurrency(path, pragmas, readers=4, writers=2, seconds=5.0):
+    """Пропускная способность чтения и записи при параллельной нагрузке."""
+    # journal_mode хранится в файле, поэтому база для замера всегда новая.
+    seed(path)
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=_worker,
+                         args=(path, pragmas, operation, deadline, results))
+        for operation, count in ((_read, readers), (_write, writers))
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    for operation, done, errors in results:
+        totals['reads' if operation is _read else 'writes'] += done
+        totals['errors'] += errors
+    totals['reads_per_s'] = round(totals['reads'] / seconds, 1)
+    totals['writes_per_s'] = round(totals['writes'] / seconds, 1)
+    return totals
+
+
+def _stat_numbers(stat):
+    return [int(part) for part in stat.split() if part.isdigit()]
+
+
+def estimated_rows(connection, table, column=None):
+    """Оценка из sqlite_stat1: строк в таблице или строк на значение column.
+
+    Статистику собирает ANALYZE (команда sqlite_analyze), до этого
+    оценки нет и возвращается None.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute('SELECT idx, stat FROM sqlite_stat1 WHERE tbl = %s',
+                       [table])
+        for index, stat in cursor.fetchall():
+            numbers = _stat_numbers(stat)
+            if column is None:
+                return numbers[0]
+            if index is None or len(numbers) < 2:
+                continue
+            cursor.execute(f'PRAGMA index_info("{index}")')
+            columns = sorted(cursor.fetchall())
+            if columns and columns[0][2] == column:
+                return numbers[1]
+    return None
@@ -6,3 +6,22 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **params):
+    query = context['request'].GET.copy()
+    for key, value in params.items():
+        if value is None:
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return query.urlencode()
+
+
+@register.filter
+def total_count(paginator):
+    """Число записей, с «~» для оценки по статистике."""
+    if getattr(paginator, 'approximate', False):
+        return f'~{paginator.display_count}'
+    return paginator.count
@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def test_settings():
+    """Тесты пишут общий кэш во временный каталог, а не в рабочий,
+    и падают на превышении бюджета запросов.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-tests-')
+    shared = {**settings.CACHES['shared'],
+              'LOCATION': os.path.join(directory, 'shared.sqlite3')}
+    try:
+        with override_settings(CACHES={**settings.CACHES, 'shared': shared},
+                               QUERY_BUDGET_STRICT=True):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._settings = ExitStack()
+        self._settings.enter_context(test_settings())
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.close()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Показывает глубину очереди задач и задержку по видам'
+
+    def handle(self, *args, **options):
+        rows = queue.stats()
+        if not rows:
+            self.stdout.write('Очередь пуста')
+        for row in rows:
+            self.stdout.write(
+                '{kind}: в очереди {queued}, готовы {ready}, '
+                'с ошибкой {failed}, задержка {latency:.1f} с'.format(**row))
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.JOBS_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float,
+                            default=settings.JOBS_POLL_INTERVAL,
+                            help='Пауза, когда очередь пуста, в секундах')
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        while True:
+            kind, taken, done = queue.work(options['batch_size'])
+            if taken:
+                self.stdout.write(f'{kind}: выполнено {done} из {taken}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
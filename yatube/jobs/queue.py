@@ -0,0 +1,146 @@
+import json
+import logging
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(kind, batch=False):
+    """Регистрирует обработчик задач вида kind.
+
+    Пакетный обработчик получает список payload всех взятых задач,
+    обычный — payload одной задачи именованными аргументами.
+    """
+    def decorator(func):
+        _handlers[kind] = (func, batch)
+        return func
+    return decorator
+
+
+def enqueue(kind, delay=0, **payload):
+    """Ставит задачу в очередь одним INSERT в текущей транзакции."""
+    return Job.objects.create(
+        kind=kind, payload=json.dumps(payload),
+        run_at=timezone.now() + timedelta(seconds=delay))
+
+
+def _ready(now):
+    return Job.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status=Job.QUEUED, run_at__lte=now,
+    )
+
+
+def claim(batch_size=None):
+    """Забирает пачку готовых задач одного вида, начиная с самой старой.
+
+    Задачи помечаются случайным токеном, поэтому несколько воркеров не
+    возьмут одну задачу дважды. Если воркер упал, задачи вернутся в
+    очередь по истечении JOBS_LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    kind = _ready(now).values_list('kind', flat=True).first()
+    if kind is None:
+        return None, []
+    ids = _ready(now).filter(kind=kind).values_list('pk', flat=True)[
+        :batch_size or settings.JOBS_BATCH_SIZE]
+    token = uuid.uuid4().hex
+    _ready(now).filter(pk__in=list(ids)).update(
+        locked_by=token,
+        locked_until=now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    return kind, list(Job.objects.filter(locked_by=token))
+
+
+def _locked(jobs):
+    """Задачи, которые всё ещё держит этот воркер.
+
+    Если блокировка истекла и задачи взял другой воркер, их токен уже
+    другой, и трогать их нельзя.
+    """
+    return Job.objects.filter(pk__in=[job.pk for job in jobs],
+                              locked_by=jobs[0].locked_by)
+
+
+def retry(jobs, error):
+    """Откладывает задачи с экспоненциальной задержкой или бросает их.
+
+    Одним UPDATE на каждое число попыток — обычно это один запрос.
+    """
+    now = timezone.now()
+    by_attempts = defaultdict(list)
+    for job in jobs:
+        by_attempts[job.attempts + 1].append(job)
+    for attempts, group in by_attempts.items():
+        if attempts >= settings.JOBS_MAX_ATTEMPTS:
+            changes = {'status': Job.FAILED}
+        else:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+            changes = {'run_at': now + timedelta(seconds=delay)}
+        _locked(group).update(attempts=attempts, last_error=error,
+                              locked_by='', locked_until=None, **changes)
+
+
+def run(kind, jobs):
+    """Выполняет взятые задачи, возвращает число выполненных."""
+    if kind not in _handlers:
+        retry(jobs, f'Нет обработчика задач {kind}')
+        return 0
+    func, batch = _handlers[kind]
+    groups = [jobs] if batch else [[job] for job in jobs]
+    done = []
+    for group in groups:
+        payloads = [json.loads(job.payload) for job in group]
+        try:
+            with transaction.atomic():
+                if batch:
+                    func(payloads)
+                else:
+                    func(**payloads[0])
+        except Exception:
+            logger.exception('Задачи %s не выполнены', kind)
+            retry(group, traceback.format_exc())
+        else:
+            done.extend(group)
+    if done:
+        _locked(done).delete()
+    return len(done)
+
+
+def work(batch_size=None):
+    """Берёт и выполняет одну пачку. Возвращает (вид, взято, выполнено)."""
+    kind, jobs = claim(batch_size)
+    if not jobs:
+        return kind, 0, 0
+    return kind, len(jobs), run(kind, jobs)
+
+
+def stats():
+    """Глубина очереди и задержка самой старой готовой задачи по видам."""
+    now = timezone.now()
+    queued = Q(status=Job.QUEUED)
+    ready = Q(status=Job.QUEUED, run_at__lte=now)
+    rows = Job.objects.values('kind').annotate(
+        queued=Count('pk', filter=queued),
+        ready=Count('pk', filter=ready),
+        failed=Count('pk', filter=Q(status=Job.FAILED)),
+        oldest=Min('run_at', filter=ready),
+    ).order_by('kind')
+    result = []
+    for row in rows:
+        oldest = row.pop('oldest')
+        row['latency'] = (now - oldest).total_seconds() if oldest else 0
+        result.append(row)
+    return result
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db import connection
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -10,6 +12,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or connection.vendor != 'sqlite':
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(id__in=search.matching_ids(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
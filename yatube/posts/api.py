@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from .models import Group, Post, User
+from .queries import post_comments, post_list
+from .utils import NEXT, CursorPaginator
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def _selected(request, fields):
+    names = request.GET.get('fields')
+    if not names:
+        return list(fields)
+    selected = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = set(selected) - set(fields)
+    if unknown:
+        raise BadRequest(
+            'Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(sorted(unknown)), ', '.join(fields)))
+    return selected
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом.')
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(
+            f'limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}.')
+    return limit
+
+
+def _item(row, selected, fields):
+    item = {name: row[fields[name]] for name in selected}
+    if 'image' in item:
+        item['image'] = (
+            default_storage.url(item['image']) if item['image'] else None)
+    return item
+
+
+def _stream(paginator, values, selected, fields):
+    rows = paginator.window(NEXT, values).iterator(
+        chunk_size=settings.API_CHUNK_SIZE)
+    yield '{"results": ['
+    last = next_cursor = None
+    for index, row in enumerate(rows):
+        if index == paginator.per_page:
+            next_cursor = paginator.encode_cursor(NEXT, last)
+            break
+        yield (',' if index else '') + encoder.encode(
+            _item(row, selected, fields))
+        last = row
+    yield '], "next": ' + encoder.encode(next_cursor) + '}'
+
+
+def _list_response(request, queryset, fields, keys, descending=True):
+    """Страница строк .values() потоком JSON, листается только вперёд."""
+    try:
+        selected = _selected(request, fields)
+        limit = _limit(request)
+    except BadRequest as error:
+        return _error(str(error))
+    paths = {fields[name] for name in selected} | set(keys)
+    paginator = CursorPaginator(queryset.values(*paths), limit, keys,
+                                descending)
+    direction, values = paginator.decode_cursor(request.GET.get('cursor'))
+    if direction != NEXT:
+        values = None
+    return StreamingHttpResponse(
+        _stream(paginator, values, selected, fields),
+        content_type='application/json')
+
+
+@require_safe
+def posts(request):
+    return _list_response(request, post_list(), POST_FIELDS,
+                          keys=('pub_date', 'id'))
+
+
+@require_safe
+def group_posts(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first())
+    if group_id is None:
+        return _error('Группа не найдена.', status=404)
+    return _list_response(request, post_list(group_id=group_id),
+                          POST_FIELDS, keys=('pub_date', 'id'))
+
+
+@require_safe
+def profile_posts(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True).first())
+    if author_id is None:
+        return _error('Автор не найден.', status=404)
+    return _list_response(request, post_list(author_id=author_id),
+                          POST_FIELDS, keys=('pub_date', 'id'))
+
+
+@require_safe
+def post_detail(request, post_id):
+    try:
+        selected = _selected(request, POST_FIELDS)
+    except BadRequest as error:
+        return _error(str(error))
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values(*{POST_FIELDS[name] for name in selected}).first())
+    if row is None:
+        return _error('Пост не найден.', status=404)
+    return JsonResponse(_item(row, selected, POST_FIELDS),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@require_safe
+def comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден.', status=404)
+    return _list_response(request, post_comments(post_id), COMMENT_FIELDS,
+                          keys=('created', 'id'),
+                          descending=request.GET.get('order') == 'new')
@@ -0,0 +1,134 @@
+import math
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from . import counters, feed
+from .models import Comment, Follow, Group, Post, User
+from .urls import app_name, urlpatterns
+
+PASSWORD = make_password(None)
+
+
+def seed(users=20, groups=5, posts=500, comments=1000, follows=100,
+         random_seed=0):
+    rnd = random.Random(random_seed)
+    User.objects.bulk_create(
+        User(username=f'bench_{i}', password=PASSWORD)
+        for i in range(users)
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench_').values_list('id', flat=True))
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'bench-{i}', description='Описание')
+        for i in range(groups)
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-').values_list('id', flat=True)) or [None]
+    Post.objects.bulk_create(
+        (Post(author_id=rnd.choice(user_ids), group_id=rnd.choice(group_ids),
+              text=f'Пост {i} ' + 'текст ' * rnd.randint(5, 60))
+         for i in range(posts)),
+        batch_size=500,
+    )
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(post_id=rnd.choice(post_ids), author_id=rnd.choice(user_ids),
+                 text=f'Комментарий {i}')
+         for i in range(comments)),
+        batch_size=500,
+    )
+    pairs = {
+        (rnd.choice(user_ids), rnd.choice(user_ids)) for _ in range(follows)
+    }
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author)
+         for user, author in pairs if user != author),
+        ignore_conflicts=True,
+    )
+    counters.reconcile()
+    for user_id in user_ids:
+        feed.rebuild(user_id)
+
+
+def routes():
+    """Адреса всех маршрутов posts.urls на засеянных данных."""
+    user = (
+        User.objects.filter(username__startswith='bench_')
+        .exclude(posts=None).order_by('id').first()
+    )
+    values = {
+        'slug': Group.objects.filter(posts__isnull=False)
+        .values_list('slug', flat=True).first(),
+        'username': user.username,
+        'post_id': user.posts.values_list('id', flat=True).first(),
+    }
+    urls = {}
+    for pattern in urlpatterns:
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        urls[pattern.name] = reverse(f'{app_name}:{pattern.name}',
+                                     kwargs=kwargs)
+    return user, urls
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(client, url, requests=50, cold=False):
+    timings, queries, sizes, statuses = [], [], [], set()
+    client.get(url)
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            size = len(b''.join(response.streaming_content))
+        else:
+            size = len(response.content)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(response.wsgi_request.query_stats.count)
+        sizes.append(size)
+        statuses.add(response.status_code)
+    return {
+        'url': url,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run(requests=50, cold=False):
+    user, urls = routes()
+    client = Client()
+    client.force_login(user)
+    return {
+        name: measure(client, url, requests, cold)
+        for name, url in urls.items()
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """Маршруты, у которых p95 или число запросов выросли."""
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(
+                (name, 'p95_ms', before['p95_ms'], result['p95_ms']))
+        if result['queries'] > before['queries']:
+            regressions.append(
+                (name, 'queries', before['queries'], result['queries']))
+    return regressions
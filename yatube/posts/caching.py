@@ -0,0 +1,152 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.views.decorators.http import condition
+
+GENERATION_KEY = 'posts:generation:{}'
+STAMP_KEY = 'posts:stamp:{}'
+PAGE_KEY = 'posts:page:{}'
+CARD_KEY = 'posts:card:{}:{}'
+COUNT_KEY = 'posts:count:{}'
+
+
+def _fresh_generation():
+    # Значение после вытеснения ключа не должно совпасть с прежним.
+    return time.time_ns()
+
+
+def _store():
+    # Поколения общие для всех процессов: веб-воркеров, run_jobs,
+    # генерации миниатюр и импорта.
+    return caches['shared']
+
+
+def _key(template, scope):
+    # Слаги и имена бывают кириллическими, в ключ идёт их хэш.
+    return template.format(hashlib.md5(scope.encode()).hexdigest())
+
+
+def generations(*scopes):
+    keys = {_key(GENERATION_KEY, scope): scope for scope in scopes}
+    store = _store()
+    found = store.get_many(keys)
+    missing = {key: _fresh_generation() for key in keys if key not in found}
+    if missing:
+        store.set_many(missing, None)
+        found.update(missing)
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def bump(*scopes):
+    scopes = set(scopes)
+    now = time.time()
+    values = {}
+    for scope in scopes:
+        # Новое значение вместо incr: общий бэкенд не обязан уметь
+        # атомарный инкремент, а два новых значения не совпадут.
+        values[_key(GENERATION_KEY, scope)] = _fresh_generation()
+        values[_key(STAMP_KEY, scope)] = now
+    _store().set_many(values, None)
+
+
+def last_modified(*scopes):
+    """Время последнего изменения любой из областей."""
+    keys = [_key(STAMP_KEY, scope) for scope in scopes]
+    store = _store()
+    found = store.get_many(keys)
+    if len(found) < len(keys):
+        # Время изменения неизвестно: считаем, что область изменилась сейчас.
+        now = time.time()
+        store.set_many({key: now for key in keys if key not in found}, None)
+        found.update(dict.fromkeys(keys, now))
+    return datetime.fromtimestamp(max(found.values()), timezone.utc)
+
+
+def scopes_for(scope_templates, kwargs):
+    return [template.format(**kwargs) for template in scope_templates]
+
+
+def _fingerprint(view, request, scopes):
+    versions = generations(*scopes)
+    raw = '|'.join((
+        view.__name__,
+        request.get_full_path(),
+        str(request.user.pk),
+        *(f'{scope}={versions[scope]}' for scope in scopes),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_card_keys(posts):
+    """Ключи карточек меняются при правке поста, комментарии, смене группы
+    и переименовании автора или группы (names).
+
+    Поколения всех постов читаются одним get_many.
+    """
+    scopes = {}
+    for post in posts:
+        scopes[post.pk] = [f'post:{post.pk}', 'names']
+        if post.group_id is not None:
+            scopes[post.pk].append(f'group:{post.group.slug}')
+    versions = generations(*{
+        scope for post_scopes in scopes.values() for scope in post_scopes})
+    return {
+        pk: CARD_KEY.format(
+            pk, '.'.join(str(versions[scope]) for scope in post_scopes))
+        for pk, post_scopes in scopes.items()
+    }
+
+
+def post_card_key(post):
+    return post_card_keys([post])[post.pk]
+
+
+def count_key(scope, queryset):
+    """Ключ числа строк queryset, меняется вместе с поколением scope."""
+    raw = f'{scope}={generations(scope)[scope]}|{queryset.query}'
+    return COUNT_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def cache_page_by_generation(*scope_templates):
+    """Кэширует GET-ответ view до изменения связанных поколений."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = scopes_for(scope_templates, kwargs)
+            key = PAGE_KEY.format(_fingerprint(view, request, scopes))
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response,
+                              settings.POSTS_PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def condition_by_generation(*scope_templates):
+    """ETag и Last-Modified по поколениям: 304 отдаётся до вызова view."""
+    def decorator(view):
+        def etag(request, *args, **kwargs):
+            scopes = scopes_for(scope_templates, kwargs)
+            return _fingerprint(view, request, scopes)
+
+        def modified(request, *args, **kwargs):
+            # ETag у каждого пользователя свой, а время изменения общее:
+            # по одному If-Modified-Since нельзя отличить чужую копию.
+            if request.user.is_authenticated:
+                return None
+            return last_modified(*scopes_for(scope_templates, kwargs))
+
+        wrapper = condition(etag_func=etag, last_modified_func=modified)(view)
+        # По этим областям страницу кэширует AnonymousPageCacheMiddleware.
+        wrapper.generation_scopes = scope_templates
+        return wrapper
+    return decorator
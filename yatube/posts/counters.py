@@ -0,0 +1,87 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+STATS_SOURCES = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _count_subquery(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def exact_stats(user_id):
+    """Точные счётчики пользователя одним запросом."""
+    return User.objects.filter(pk=user_id).annotate(**{
+        name: _count_subquery(model, field)
+        for name, (model, field) in STATS_SOURCES.items()
+    }).values(*STATS_SOURCES).get()
+
+
+def _create_stats(user_id):
+    # INSERT OR IGNORE: строку мог только что создать параллельный запрос.
+    stats = AuthorStats(user_id=user_id, **exact_stats(user_id))
+    AuthorStats.objects.bulk_create([stats], ignore_conflicts=True)
+    return stats
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return _create_stats(user.pk)
+
+
+def _shifted(name, delta):
+    return Greatest(F(name) + delta, 0)
+
+
+def recount_comments(post_ids):
+    """Точный пересчёт одним UPDATE: повтор задачи ничего не сломает."""
+    Post.objects.filter(pk__in=post_ids).update(
+        comments_count=_count_subquery(Comment, 'post'))
+
+
+def bump_stats(user_id, name, delta):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{name: _shifted(name, delta)})
+    if not updated and delta > 0:
+        _create_stats(user_id)
+
+
+def reconcile():
+    """Исправляет расхождения счётчиков, возвращает число исправлений."""
+    repaired = 0
+    posts = Post.objects.annotate(
+        real=_count_subquery(Comment, 'post')
+    ).exclude(comments_count=F('real'))
+    for post_id, real in posts.values_list('pk', 'real').iterator():
+        Post.objects.filter(pk=post_id).update(comments_count=real)
+        repaired += 1
+    stored_fields = [f'stats__{name}' for name in STATS_SOURCES]
+    users = User.objects.annotate(**{
+        name: _count_subquery(model, field)
+        for name, (model, field) in STATS_SOURCES.items()
+    }).values('pk', *STATS_SOURCES, *stored_fields)
+    for row in users.iterator():
+        real = {name: row[name] for name in STATS_SOURCES}
+        stored = {
+            name: row[field]
+            for name, field in zip(STATS_SOURCES, stored_fields)
+        }
+        if row[stored_fields[0]] is None and not any(real.values()):
+            continue
+        if stored != real:
+            AuthorStats.objects.update_or_create(user_id=row['pk'],
+                                                 defaults=real)
+            repaired += 1
+    return repaired
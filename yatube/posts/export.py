@@ -0,0 +1,95 @@
+import zipfile
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+POST_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _rows(queryset, kind, fields):
+    rows = queryset.order_by('pk').values(*fields.values()).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield {'type': kind,
+               **{name: row[path] for name, path in fields.items()}}
+
+
+def records(user):
+    """Посты и комментарии пользователя в формате import_posts."""
+    yield from _rows(Post.objects.filter(author=user), 'post', POST_FIELDS)
+    yield from _rows(Comment.objects.filter(author=user), 'comment',
+                     COMMENT_FIELDS)
+
+
+def jsonl(user):
+    for record in records(user):
+        yield (encoder.encode(record) + '\n').encode()
+
+
+class _Pipe:
+    """Файл только для записи: zipfile пишет, генератор забирает байты."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def archive(user):
+    """Zip с posts.jsonl и картинками, собирается по мере отдачи."""
+    return (chunk for chunk in _archive(user) if chunk)
+
+
+def _archive(user):
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as package:
+        with package.open('posts.jsonl', 'w', force_zip64=True) as entry:
+            for line in jsonl(user):
+                entry.write(line)
+                yield pipe.drain()
+        images = (
+            Post.objects.filter(author=user).exclude(image='')
+            .order_by('pk').values_list('image', flat=True)
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        for name in images:
+            if not default_storage.exists(name):
+                continue
+            info = zipfile.ZipInfo(name, datetime.now().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name) as image, \
+                    package.open(info, 'w', force_zip64=True) as entry:
+                for chunk in image.chunks():
+                    entry.write(chunk)
+                    yield pipe.drain()
+    yield pipe.drain()
@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from jobs import queue
+
+from .models import FeedEntry, Follow, Post
+
+# Не больше 999 параметров в запросе SQLite.
+TRIM_CHUNK_SIZE = 500
+
+
+def trim(*user_ids):
+    """Обрезает ленты до FEED_MAX_ENTRIES одним DELETE на пачку лент."""
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    for start in range(0, len(user_ids), TRIM_CHUNK_SIZE):
+        ranked = (
+            FeedEntry.objects
+            .filter(user_id__in=user_ids[start:start + TRIM_CHUNK_SIZE])
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=[F('user_id')],
+                order_by=[F('pub_date').desc(), F('post_id').desc()],
+            ))
+            .order_by().values('id', 'position')
+        )
+        sql, params = ranked.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN '
+                f'(SELECT id FROM ({sql}) WHERE position > %s)',
+                (*params, settings.FEED_MAX_ENTRIES),
+            )
+
+
+def _add_posts(user_id, posts):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post, followers=None):
+    if followers is None:
+        followers = list(
+            Follow.objects.filter(author_id=post.author_id)
+            .values_list('user_id', flat=True)
+        )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post,
+                      author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    trim(*followers)
+
+
+def fan_out_many(post_ids):
+    """Раскладывает пачку постов воркером: одна вставка и обрезка лент."""
+    posts = list(Post.objects.filter(pk__in=post_ids).values_list(
+        'id', 'author_id', 'pub_date'))
+    followers = defaultdict(list)
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={author_id for _, author_id, _ in posts}
+    ).values_list('author_id', 'user_id'):
+        followers[author_id].append(user_id)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+            for user_id in followers[author_id]
+        ],
+        ignore_conflicts=True,
+    )
+    trim(*{user_id for users in followers.values() for user_id in users})
+
+
+def distribute(post):
+    """Ленты немногих подписчиков пополняются сразу, остальные — воркером."""
+    limit = settings.FEED_INLINE_FAN_OUT
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    if len(followers) > limit:
+        queue.enqueue('posts.fan_out', post_id=post.pk)
+    else:
+        fan_out(post, followers)
+
+
+def backfill(user_id, author_id):
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'author_id', 'pub_date')
+        [:settings.FEED_MAX_ENTRIES]
+    )
+    _add_posts(user_id, posts)
+    trim(user_id)
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    posts = (
+        Post.objects.filter(author__following__user_id=user_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'author_id', 'pub_date')
+        [:settings.FEED_MAX_ENTRIES]
+    )
+    _add_posts(user_id, posts)
@@ -0,0 +1,44 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from . import caching
+from .models import Follow
+
+FOLLOWING_KEY = 'posts:following:{}:{}'
+
+
+def _scope(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id.
+
+    Массив лежит в общем кэше под поколением following:<user_id>.
+    Подписка и отписка в любом процессе меняют поколение, и следующее
+    чтение собирает массив заново — с основной базы, а не с реплики.
+    """
+    scope = _scope(user_id)
+    key = FOLLOWING_KEY.format(user_id, caching.generations(scope)[scope])
+    store = caches['shared']
+    ids = store.get(key)
+    if ids is None:
+        ids = array('q', Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id=user_id).order_by('author_id').values_list(
+            'author_id', flat=True))
+        store.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user_id, author_id):
+    ids = following_ids(user_id)
+    position = bisect_left(ids, author_id)
+    return position < len(ids) and ids[position] == author_id
+
+
+def forget(*user_ids):
+    caching.bump(*(_scope(user_id) for user_id in user_ids))
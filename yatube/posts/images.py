@@ -0,0 +1,92 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+
+CONTENT_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg',
+                 'PNG': 'image/png'}
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def output_format(image):
+    """WebP, если Pillow его умеет, иначе JPEG или PNG для прозрачных."""
+    preferred = settings.POST_IMAGE_FORMAT
+    if preferred == 'WEBP' and features.check('webp'):
+        return 'WEBP'
+    return 'PNG' if _has_alpha(image) else 'JPEG'
+
+
+def check_size(image):
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)s×%(height)s пикселей.',
+            code='image_too_large',
+            params={'width': width, 'height': height},
+        )
+
+
+def check_animation(image, upload):
+    """Анимацию не пережимаем, поэтому её размеры ограничены сразу."""
+    limit = settings.POST_IMAGE_MAX_SIZE
+    if max(image.size) > limit:
+        raise ValidationError(
+            'Анимация больше %(limit)s пикселей по стороне.',
+            code='animation_too_large',
+            params={'limit': limit},
+        )
+    if upload.size > settings.POST_IMAGE_MAX_ANIMATED_BYTES:
+        raise ValidationError(
+            'Анимация больше %(limit)s МБ.',
+            code='animation_too_heavy',
+            params={'limit': settings.POST_IMAGE_MAX_ANIMATED_BYTES >> 20},
+        )
+
+
+def _encode(image, image_format):
+    output = io.BytesIO()
+    if image_format == 'PNG':
+        image.save(output, 'PNG', optimize=True)
+    elif image_format == 'WEBP':
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+        image.save(output, 'WEBP', quality=settings.POST_IMAGE_QUALITY,
+                   method=6)
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(
+            output, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+            optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def normalize(upload):
+    """Поворачивает по EXIF, уменьшает и перекодирует загруженный файл.
+
+    EXIF в результат не копируется. Анимированные изображения
+    сохраняются как есть, чтобы не потерять кадры, если укладываются
+    в POST_IMAGE_MAX_SIZE и POST_IMAGE_MAX_ANIMATED_BYTES.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        check_size(image)
+        if getattr(image, 'is_animated', False):
+            check_animation(image, upload)
+            upload.seek(0)
+            return upload
+        image = ImageOps.exif_transpose(image)
+        limit = settings.POST_IMAGE_MAX_SIZE
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        image_format = output_format(image)
+        content = _encode(image, image_format)
+    name = '{}.{}'.format(os.path.splitext(upload.name)[0],
+                          image_format.lower().replace('jpeg', 'jpg'))
+    return SimpleUploadedFile(name, content, CONTENT_TYPES[image_format])
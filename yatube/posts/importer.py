@@ -0,0 +1,276 @@
+import csv
+import json
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, feed, follows
+from .models import (Comment, Follow, Group, ImportCheckpoint, ImportedPost,
+                     ImportedUser, Post, User)
+from .queries import count_scopes
+
+PASSWORD = make_password(None)
+# Ограничение SQLite на число параметров в одном запросе.
+LOOKUP_CHUNK = 500
+
+
+def read_jsonl(path, start=0):
+    """Записи JSONL с позицией в байтах после каждой строки."""
+    with open(path, 'rb') as source:
+        source.seek(start)
+        for line in iter(source.readline, b''):
+            if line.strip():
+                yield source.tell(), json.loads(line)
+
+
+def read_csv(path, start=0):
+    """Записи CSV с заголовком и позицией в байтах после каждой.
+
+    csv.reader берёт строки по одной и ровно до конца записи, так что
+    tell() после неё указывает на начало следующей, даже если в полях
+    есть переводы строк.
+    """
+    with open(path, 'rb') as source:
+        header = next(csv.reader([source.readline().decode('utf-8')]))
+        if start:
+            source.seek(start)
+        lines = (line.decode('utf-8')
+                 for line in iter(source.readline, b''))
+        for row in csv.reader(lines):
+            if row:
+                yield source.tell(), {key: value or None
+                                      for key, value in zip(header, row)}
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def lookup(queryset, field, values, *fields):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        yield from queryset.filter(
+            **{f'{field}__in': chunk}).values_list(*fields)
+
+
+def parse_date(value):
+    date = parse_datetime(value) if value else None
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        return timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def create(model, objects, dated):
+    """bulk_create с id у объектов и датами из источника.
+
+    SQLite не возвращает id из bulk_create. Пачка идёт под блокировкой
+    записи (см. Importer.run), поэтому строки новее прежнего максимума —
+    ровно наши и в порядке вставки. auto_now_add перезаписывает дату
+    поля dated, её возвращаем отдельным bulk_update.
+    """
+    if not objects:
+        return
+    dates = [getattr(obj, dated) for obj in objects]
+    latest = None
+    if not connection.features.can_return_ids_from_bulk_insert:
+        latest = model.objects.aggregate(latest=Max('pk'))['latest'] or 0
+    model.objects.bulk_create(objects)
+    if latest is not None:
+        ids = model.objects.filter(pk__gt=latest).order_by(
+            'pk').values_list('pk', flat=True)
+        for obj, pk in zip(objects, ids):
+            obj.pk = pk
+    for obj, date in zip(objects, dates):
+        setattr(obj, dated, date)
+    model.objects.bulk_update(objects, [dated])
+
+
+class Importer:
+    def __init__(self, source, batch_size=500):
+        self.source = source
+        self.batch_size = batch_size
+        self.counts = Counter()
+        self.authors = set()
+        self.followers = set()
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=source)
+
+    def run(self, records):
+        """Импортирует записи пачками, после каждой отдаёт её размер."""
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                # Первая запись в транзакции берёт блокировку SQLite
+                # до коммита: чужие вставки не смешаются с нашими.
+                self.checkpoint.save(update_fields=['updated'])
+                scopes = self.import_batch([record for _, record in batch])
+                self.remember()
+                self.checkpoint.position = batch[-1][0]
+                self.checkpoint.rows += len(batch)
+                self.checkpoint.save()
+            caching.bump(*scopes)
+            yield len(batch)
+
+    def import_batch(self, records):
+        kinds = {'post': [], 'comment': [], 'follow': []}
+        for record in records:
+            kinds.get(record.get('type'), []).append(record)
+        self.counts['skipped'] += len(records) - sum(map(len, kinds.values()))
+        users = self.users({
+            record.get(name) for record in records
+            for name in ('author', 'user')
+        } - {None})
+        groups = self.groups(
+            {record.get('group') for record in kinds['post']} - {None})
+        scopes = {'all'}
+        scopes |= self.posts(kinds['post'], users, groups)
+        scopes |= self.comments(kinds['comment'], users)
+        scopes |= self.follows(kinds['follow'], users)
+        return scopes
+
+    def users(self, names):
+        found = dict(lookup(User.objects, 'username', names,
+                            'username', 'id'))
+        missing = names - found.keys()
+        if missing:
+            User.objects.bulk_create(
+                [User(username=name, password=PASSWORD) for name in missing],
+                ignore_conflicts=True,
+            )
+            found.update(lookup(User.objects, 'username', missing,
+                                'username', 'id'))
+            self.counts['users'] += len(missing)
+        return found
+
+    def groups(self, slugs):
+        found = dict(lookup(Group.objects, 'slug', slugs, 'slug', 'id'))
+        missing = slugs - found.keys()
+        if missing:
+            Group.objects.bulk_create(
+                [Group(title=slug, slug=slug, description='')
+                 for slug in missing],
+                ignore_conflicts=True,
+            )
+            found.update(lookup(Group.objects, 'slug', missing, 'slug', 'id'))
+            self.counts['groups'] += len(missing)
+        return found
+
+    def posts(self, records, users, groups):
+        posts, external_ids, scopes = [], [], set()
+        for record in records:
+            author_id = users.get(record.get('author'))
+            if author_id is None or not record.get('text'):
+                self.counts['skipped'] += 1
+                continue
+            posts.append(Post(
+                author_id=author_id,
+                group_id=groups.get(record.get('group')),
+                text=record['text'],
+                image=record.get('image') or '',
+                pub_date=parse_date(record.get('pub_date')),
+            ))
+            external_ids.append(record.get('id'))
+            self.authors.add(author_id)
+            scopes.add(f'author:{record["author"]}')
+            if record.get('group'):
+                scopes.add(f'group:{record["group"]}')
+        create(Post, posts, 'pub_date')
+        ImportedPost.objects.bulk_create(
+            ImportedPost(source=self.source, external_id=str(external_id),
+                         post_id=post.pk)
+            for post, external_id in zip(posts, external_ids)
+            if external_id is not None
+        )
+        self.counts['posts'] += len(posts)
+        if posts:
+            scopes.update(count_scopes(
+                scope[len('group:'):] for scope in scopes
+                if scope.startswith('group:')))
+        return scopes
+
+    def comments(self, records, users):
+        post_ids = dict(lookup(
+            ImportedPost.objects.filter(source=self.source), 'external_id',
+            {str(record.get('post')) for record in records},
+            'external_id', 'post_id',
+        ))
+        comments = []
+        for record in records:
+            post_id = post_ids.get(str(record.get('post')))
+            author_id = users.get(record.get('author'))
+            if None in (post_id, author_id) or not record.get('text'):
+                self.counts['skipped'] += 1
+                continue
+            comments.append(Comment(
+                post_id=post_id, author_id=author_id, text=record['text'],
+                created=parse_date(record.get('created')),
+            ))
+        create(Comment, comments, 'created')
+        self.counts['comments'] += len(comments)
+        return {f'post:{comment.post_id}' for comment in comments}
+
+    def follows(self, records, users):
+        follows = set()
+        for record in records:
+            user_id = users.get(record.get('user'))
+            author_id = users.get(record.get('author'))
+            if None in (user_id, author_id) or user_id == author_id:
+                self.counts['skipped'] += 1
+                continue
+            follows.add((user_id, author_id))
+            self.followers.add(user_id)
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follows],
+            ignore_conflicts=True,
+        )
+        self.counts['follows'] += len(follows)
+        return {f'author:{record[name]}' for record in records
+                for name in ('user', 'author') if record.get(name)}
+
+    def remember(self):
+        """Сохраняет авторов и подписчиков пачки вместе с позицией."""
+        ImportedUser.objects.bulk_create(
+            [ImportedUser(source=self.source, user_id=user_id, role=role)
+             for role, users in ((ImportedUser.AUTHOR, self.authors),
+                                 (ImportedUser.FOLLOWER, self.followers))
+             for user_id in users],
+            ignore_conflicts=True,
+        )
+        self.authors.clear()
+        self.followers.clear()
+
+    def finish(self):
+        """Счётчики и ленты: bulk_create не вызывает сигналы.
+
+        Участники берутся из базы, а не из памяти: так учитываются и
+        пачки, импортированные до перезапуска.
+        """
+        counters.reconcile()
+        imported = ImportedUser.objects.filter(source=self.source)
+        followers = set(imported.filter(
+            role=ImportedUser.FOLLOWER).values_list('user_id', flat=True))
+        follows.forget(*followers)
+        followers.update(Follow.objects.filter(
+            author_id__in=imported.filter(
+                role=ImportedUser.AUTHOR).values('user_id'),
+        ).values_list('user_id', flat=True))
+        for user_id in followers:
+            feed.rebuild(user_id)
+        imported.delete()
+        return len(followers)
@@ -0,0 +1,76 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Засевает тестовую базу и измеряет задержку, число запросов '
+        'и размер ответа для всех маршрутов posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', help='JSON прошлого прогона')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95, доля')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            volumes = {
+                name: options[name]
+                for name in ('users', 'groups', 'posts', 'comments',
+                             'follows')
+            }
+            benchmark.seed(**volumes)
+            results = benchmark.run(options['requests'], options['cold'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} p50={result["p50_ms"]:>8.2f}ms '
+                f'p95={result["p95_ms"]:>8.2f}ms '
+                f'p99={result["p99_ms"]:>8.2f}ms '
+                f'queries={result["queries"]:>3} bytes={result["bytes"]}'
+            )
+        report = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'volumes': volumes,
+            },
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = benchmark.compare(
+                    json.load(baseline)['routes'], results,
+                    options['threshold'])
+            for name, metric, before, after in regressions:
+                self.stdout.write(
+                    self.style.ERROR(f'{name}: {metric} {before} -> {after}'))
+            if regressions:
+                raise CommandError(f'Регрессий: {len(regressions)}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для всех изображений постов'
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True).iterator()
+        )
+        total = 0
+        for name in names:
+            thumbnails.generate(name)
+            total += 1
+        self.stdout.write(f'Обработано изображений: {total}')
@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты, комментарии и подписки из JSONL или '
+        'CSV; после сбоя продолжает с последней сохранённой пачки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(importer.READERS),
+                            help='По умолчанию — по расширению файла')
+        parser.add_argument('--source',
+                            help='Имя импорта для контрольной точки')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--report-every', type=int, default=20,
+                            help='Печатать скорость каждые N пачек')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.'))
+        if source_format not in importer.READERS:
+            raise CommandError(f'Неизвестный формат: {source_format}')
+        run = importer.Importer(
+            options['source'] or os.path.abspath(path),
+            options['batch_size'],
+        )
+        position = run.checkpoint.position
+        if position:
+            self.stdout.write(
+                f'Продолжаем с позиции {position}, '
+                f'уже импортировано записей: {run.checkpoint.rows}')
+        records = importer.READERS[source_format](path, position)
+        start = time.perf_counter()
+        total = 0
+        for number, size in enumerate(run.run(records), 1):
+            total += size
+            if number % options['report_every'] == 0:
+                self.report(total, start)
+        self.report(total, start)
+        rebuilt = run.finish()
+        counts = ', '.join(
+            f'{name}={count}' for name, count in sorted(run.counts.items()))
+        self.stdout.write(f'Готово: {counts or "нет записей"}; '
+                          f'пересобрано лент: {rebuilt}')
+
+    def report(self, total, start):
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Записей: {total}, {rate:.0f} в секунду')
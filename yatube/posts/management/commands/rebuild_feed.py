@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import feed
+from posts.models import FeedEntry, Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        else:
+            users = users.filter(
+                Q(id__in=Follow.objects.values('user_id'))
+                | Q(id__in=FeedEntry.objects.values('user_id'))
+            )
+        total = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            feed.rebuild(user_id)
+            total += 1
+        self.stdout.write(f'Пересобрано лент: {total}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс постов и его триггеры '
+        '(например, после миграции, пересоздавшей таблицу posts_post)'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.uninstall(cursor)
+            search.install(cursor)
+        self.stdout.write('Поисковый индекс пересобран')
@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .caching import generations, scopes_for
+
+ANONYMOUS_PAGE_KEY = 'posts:anonymous:{}'
+REFRESH_LOCK_KEY = 'posts:anonymous:refresh:{}'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _executor_instance():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ANONYMOUS_CACHE_REFRESH_WORKERS,
+                thread_name_prefix='page-cache-refresh',
+            )
+    return _executor
+
+
+def normalized_url(request):
+    """Путь и отсортированные параметры запроса без utm-меток."""
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(request.META.get('QUERY_STRING', ''))
+        if not name.startswith('utm_')
+    )
+    return f'{request.path}?{urlencode(params)}'
+
+
+class AnonymousPageCacheMiddleware:
+    """Страницы гостей целиком из кэша, минуя остальной стек.
+
+    Кэшируются только view с generation_scopes. Обновляет устаревшую
+    копию один запрос, остальные тем временем получают её как есть.
+    Vary: Cookie не учитывается: гости без сессии видят одно и то же,
+    а Set-Cookie и страницы с CSRF-токеном в кэш не попадают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        scopes = self.scopes(request)
+        if scopes is None:
+            return self.get_response(request)
+        url = normalized_url(request)
+        key = ANONYMOUS_PAGE_KEY.format(hashlib.md5(url.encode()).hexdigest())
+        version = self.version(scopes)
+        entry = cache.get(key)
+        if entry is None:
+            response = self.get_response(request)
+            self.store(request, response, key, version)
+            return response
+        if entry['version'] != version:
+            response = self.rebuild(request, key, version)
+            if response is not None:
+                return response
+        elif entry['expires'] < time.time():
+            self.revalidate(request, key, version)
+        return self.cached_response(request, entry)
+
+    def scopes(self, request):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+        ):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        templates = getattr(match.func, 'generation_scopes', None)
+        if templates is None:
+            return None
+        return scopes_for(templates, match.kwargs)
+
+    @staticmethod
+    def version(scopes):
+        versions = generations(*scopes)
+        return '|'.join(str(versions[scope]) for scope in scopes)
+
+    def store(self, request, response, key, version):
+        if (
+            request.method != 'GET' or response.status_code != 200
+            or response.streaming
+            or request.META.get('CSRF_COOKIE_USED')
+        ):
+            return
+        cache.set(key, {
+            'version': version,
+            'expires': time.time() + settings.ANONYMOUS_CACHE_FRESH_SECONDS,
+            'status': response.status_code,
+            'headers': list(response.items()),
+            'content': response.content,
+        }, settings.ANONYMOUS_CACHE_STALE_SECONDS)
+
+    @staticmethod
+    def lock(key):
+        lock = REFRESH_LOCK_KEY.format(key)
+        if cache.add(lock, 1, settings.ANONYMOUS_CACHE_REFRESH_TIMEOUT):
+            return lock
+        return None
+
+    def rebuild(self, request, key, version):
+        """Данные изменились: страницу пересобирает первый запрос.
+
+        Остальные, пока он работает, получают прежнюю копию.
+        """
+        lock = self.lock(key)
+        if lock is None:
+            return None
+        try:
+            response = self.get_response(request)
+            self.store(request, response, key, version)
+        finally:
+            cache.delete(lock)
+        return response
+
+    def revalidate(self, request, key, version):
+        """Копия просрочена по времени: отдаём её и обновляем в фоне."""
+        lock = self.lock(key)
+        if lock is None:
+            return
+        fresh = WSGIRequest(request.environ.copy())
+        fresh.method = 'GET'
+        if settings.ANONYMOUS_CACHE_BACKGROUND_REFRESH:
+            _executor_instance().submit(
+                self.refresh_in_background, fresh, key, version, lock)
+        else:
+            self.refresh(fresh, key, version, lock)
+
+    def refresh(self, request, key, version, lock):
+        try:
+            self.store(request, self.get_response(request), key, version)
+        finally:
+            cache.delete(lock)
+
+    def refresh_in_background(self, *args):
+        # Потоки пула живут долго: соединения закрываются так же, как
+        # в начале и конце обычного запроса.
+        close_old_connections()
+        try:
+            self.refresh(*args)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def cached_response(request, entry):
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')),
+            response=response,
+        )
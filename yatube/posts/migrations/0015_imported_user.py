@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedUser',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('role', models.CharField(choices=[('author', 'Автор'), ('follower', 'Подписчик')], max_length=8)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importeduser',
+            constraint=models.UniqueConstraint(fields=('source', 'user', 'role'), name='Уникальный участник импорта'),
+        ),
+    ]
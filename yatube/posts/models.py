@@ -26,13 +26,30 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = (
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -57,6 +74,13 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField('date published', auto_now_add=True)
 
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = (
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        )
+
     def __str__(self):
         return self.text
 
@@ -78,3 +102,99 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=('user', 'author'), name='Пара уникальных значений'),
         )
+        indexes = (
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        )
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='Уникальная запись ленты'),
+        )
+        indexes = (
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        )
+
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(max_length=255, unique=True)
+    position = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+
+class ImportedUser(models.Model):
+    """Чьи ленты пересобрать в конце импорта, даже после перезапуска."""
+    AUTHOR = 'author'
+    FOLLOWER = 'follower'
+
+    source = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    role = models.CharField(
+        max_length=8,
+        choices=((AUTHOR, 'Автор'), (FOLLOWER, 'Подписчик')),
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('source', 'user', 'role'),
+                name='Уникальный участник импорта'),
+        )
+
+
+class ImportedPost(models.Model):
+    source = models.CharField(max_length=255)
+    external_id = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('source', 'external_id'),
+                name='Уникальный внешний id поста'),
+        )
@@ -0,0 +1,31 @@
+from .models import Comment, Post
+
+
+def post_list(**filters):
+    """Посты для лент: общей, группы и автора."""
+    return Post.objects.filter(**filters).select_related('group', 'author')
+
+
+def post_comments(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related('author')
+
+
+def post_scopes(post_ids):
+    """Области кэша, на страницах которых видны эти посты."""
+    scopes = ['all', *(f'post:{post_id}' for post_id in post_ids)]
+    rows = Post.objects.filter(pk__in=post_ids).values_list(
+        'author__username', 'group__slug')
+    for username, slug in rows:
+        scopes.append(f'author:{username}')
+        if slug is not None:
+            scopes.append(f'group:{slug}')
+    return scopes
+
+
+def count_scopes(group_slugs):
+    """Области кэша числа постов в лентах.
+
+    Комментарии и миниатюры их не трогают: число меняется, только когда
+    пост появляется, удаляется или переходит в другую группу.
+    """
+    return ['count:all', *(f'count:group:{slug}' for slug in group_slugs)]
@@ -0,0 +1,99 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+INSTALL_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    "AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    "AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    "AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+UNINSTALL_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def install(cursor):
+    """Создаёт индекс FTS5 и триггеры и заново наполняет индекс."""
+    for sql in INSTALL_SQL:
+        cursor.execute(sql)
+
+
+def uninstall(cursor):
+    for sql in UNINSTALL_SQL:
+        cursor.execute(sql)
+
+
+def to_match(query):
+    # Каждое слово ищется как отдельная фраза, чтобы пользовательский ввод
+    # не разбирался как синтаксис FTS5.
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+class Rowids(RawSQL):
+    """Подзапрос для id__in: Django 2.2 сам берёт его в скобки.
+
+    Двойные скобки SQLite читает как скалярный подзапрос и оставляет
+    от выборки одну строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def matching_ids(query):
+    return Rowids(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [to_match(query)],
+    )
+
+
+def search(query, queryset=None):
+    """Посты с совпадениями, лучшие первыми; rank — оценка bm25.
+
+    Индекс FTS5 соединяется с постами один раз: MATCH выполняется
+    один раз на запрос, а rank — столбец соединённой таблицы, по нему
+    же сортирует и фильтрует курсор.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    match = to_match(query)
+    if not match:
+        queryset = queryset.none()
+    elif connection.vendor != 'sqlite':
+        queryset = queryset.filter(text__icontains=query)
+    if not match or connection.vendor != 'sqlite':
+        return queryset.annotate(
+            rank=Value(0.0, output_field=FloatField())).order_by('id')
+    table = Post._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(
+        rank=RawSQL(f'{FTS_TABLE}.rank', [], output_field=FloatField()),
+    ).order_by('rank', 'id')
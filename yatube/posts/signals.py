@@ -0,0 +1,167 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from jobs import queue
+
+from . import caching, counters, feed, follows
+from .models import Comment, Follow, Group, Post, User
+from .queries import count_scopes, post_scopes
+
+# Поля автора, которые видны на страницах постов.
+AUTHOR_NAMES = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.distribute(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_following(sender, instance, raw=False, **kwargs):
+    if not raw:
+        follows.forget(instance.user_id)
+        # И ещё раз после коммита: чтение до него могло собрать под новым
+        # поколением набор без этой подписки.
+        transaction.on_commit(lambda: follows.forget(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(sender, instance, **kwargs):
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_stats(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, 'posts_count', -1)
+
+
+# Счётчик комментариев пересчитывает воркер: запрос на комментарий
+# не ждёт UPDATE горячей строки поста.
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        queue.enqueue('posts.count_comments', post_id=instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    queue.enqueue('posts.count_comments', post_id=instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_stats(instance.author_id, 'followers_count', 1)
+        counters.bump_stats(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, 'followers_count', -1)
+    counters.bump_stats(instance.user_id, 'following_count', -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    if not instance._state.adding and not raw:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, signal, created=False,
+                          **kwargs):
+    scopes = ['all', f'post:{instance.pk}']
+    if Post.author.is_cached(instance):
+        scopes.append(f'author:{instance.author.username}')
+    else:
+        users = User.objects.filter(pk=instance.author_id)
+        scopes += [f'author:{name}' for name in users.values_list(
+            'username', flat=True)]
+    previous_group_id = getattr(instance, '_previous_group_id',
+                                instance.group_id)
+    group_ids = {instance.group_id, previous_group_id} - {None}
+    slugs = []
+    if group_ids:
+        slugs = list(Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True))
+        scopes += [f'group:{slug}' for slug in slugs]
+    if (signal is post_delete or created
+            or previous_group_id != instance.group_id):
+        scopes += count_scopes(slugs)
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    caching.bump(*post_scopes([instance.post_id]))
+
+
+def _previous(instance, fields, update_fields):
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values_list(
+        *fields).first()
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    if not raw:
+        instance._previous_slug = _previous(instance, ('slug',),
+                                            update_fields)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    # Старый адрес группы после смены слага не должен отдаваться из кэша.
+    slugs = {instance.slug}
+    if getattr(instance, '_previous_slug', None):
+        slugs.add(instance._previous_slug[0])
+    caching.bump('all', 'names', *(f'group:{slug}' for slug in slugs))
+
+
+@receiver(pre_save, sender=User)
+def remember_names(sender, instance, raw=False, update_fields=None,
+                   **kwargs):
+    if not raw:
+        instance._previous_names = _previous(instance, AUTHOR_NAMES,
+                                             update_fields)
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_author(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    current = tuple(getattr(instance, field) for field in AUTHOR_NAMES)
+    if previous is not None and previous != current:
+        caching.bump('names', f'author:{previous[0]}',
+                     f'author:{instance.username}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    usernames = User.objects.filter(
+        pk__in=(instance.user_id, instance.author_id)
+    ).values_list('username', flat=True)
+    caching.bump(*(f'author:{username}' for username in usernames))
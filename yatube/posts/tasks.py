@@ -0,0 +1,20 @@
+from jobs import queue
+
+from . import caching, counters, feed
+from .queries import post_scopes
+
+
+def _post_ids(payloads):
+    return sorted({payload['post_id'] for payload in payloads})
+
+
+@queue.handler('posts.fan_out', batch=True)
+def fan_out(payloads):
+    feed.fan_out_many(_post_ids(payloads))
+
+
+@queue.handler('posts.count_comments', batch=True)
+def count_comments(payloads):
+    post_ids = _post_ids(payloads)
+    counters.recount_comments(post_ids)
+    caching.bump(*post_scopes(post_ids))
@@ -0,0 +1,53 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from posts import caching, thumbnails
+
+register = template.Library()
+
+MISSING = object()
+
+
+@register.simple_tag
+def prefetch_post_cards(posts):
+    """Карточки страницы одним get_many, миниатюры недостающих — разом."""
+    posts = list(posts)
+    keys = caching.post_card_keys(posts)
+    cards = cache.get_many(list(keys.values()))
+    images = [post for post in posts
+              if keys[post.pk] not in cards and post.image]
+    found = dict(zip(
+        (post.pk for post in images),
+        thumbnails.lookup_many([post.image for post in images], 'card'),
+    ))
+    for post in posts:
+        post.card = (keys[post.pk], cards.get(keys[post.pk]),
+                     found.get(post.pk))
+    return ''
+
+
+def _render(post, key, image):
+    html = render_to_string('includes/post_card.html',
+                            {'post': post, 'image': image})
+    # Пока миниатюры нет, карточку не кэшируем: иначе она так и
+    # останется с исходной картинкой.
+    if image is None or image is not post.image:
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return html
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста без данных зрителя, общая для всех пользователей."""
+    if hasattr(post, 'card'):
+        key, html, image = post.card
+    else:
+        key, image = caching.post_card_key(post), MISSING
+        html = cache.get(key)
+    if html is not None:
+        return html
+    if image is MISSING:
+        image = thumbnails.lookup(post.image, 'card') if post.image else None
+    return _render(post, key, image)
@@ -0,0 +1,25 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, alias):
+    if not image:
+        return None
+    return thumbnails.lookup(image, alias)
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, alias):
+    """Кладёт в post.thumbnail миниатюры всех постов страницы разом."""
+    posts = list(posts)
+    images = [post for post in posts if post.image]
+    found = thumbnails.lookup_many([post.image for post in images], alias)
+    for post in posts:
+        post.thumbnail = None
+    for post, thumbnail in zip(images, found):
+        post.thumbnail = thumbnail
+    return ''
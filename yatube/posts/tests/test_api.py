@@ -0,0 +1,100 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from jobs import queue
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+def read(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+@override_settings(API_PAGE_SIZE=5)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug',
+            description='Тестовое описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(12)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+        queue.work()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_list_cursor_pages(self):
+        '''Список постов листается курсором до конца'''
+        url = reverse('posts:api_posts')
+        seen, cursor = [], None
+        while True:
+            data = {'cursor': cursor} if cursor else {}
+            response = self.client.get(url, data)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            payload = read(response)
+            seen.extend(item['id'] for item in payload['results'])
+            cursor = payload['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+
+    def test_field_selection(self):
+        '''Параметр fields ограничивает поля ответа'''
+        response = self.client.get(
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}),
+            {'fields': 'text,author', 'limit': 1})
+        payload = read(response)
+        self.assertEqual(payload['results'],
+                         [{'text': 'Пост 11', 'author': 'writer'}])
+
+        response = self.client.get(reverse('posts:api_posts'),
+                                   {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('posts:api_posts'),
+                                   {'limit': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_and_comments(self):
+        '''Пост и его комментарии отдаются в JSON'''
+        response = self.client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.json()['comments_count'], 3)
+        self.assertIsNone(response.json()['image'])
+
+        response = self.client.get(
+            reverse('posts:api_comments', kwargs={'post_id': self.post.id}),
+            {'order': 'new', 'fields': 'text'})
+        self.assertEqual(
+            [item['text'] for item in read(response)['results']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0'])
+
+        response = self.client.get(
+            reverse('posts:api_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_queries(self):
+        '''Профиль автора читается двумя запросами без COUNT'''
+        url = reverse('posts:api_profile_posts',
+                      kwargs={'username': 'writer'})
+        with CaptureQueriesContext(connection) as queries:
+            read(self.client.get(url))
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in queries))
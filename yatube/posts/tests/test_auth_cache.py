@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.auth import USER_KEY
+from core.cache import SQLiteCache
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth',
+                                            password='old-password')
+        Post.objects.create(author=cls.user, text='Пост')
+        cls.index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        # База откатывается после теста, общий кэш с пользователем — нет.
+        caches['shared'].clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_cached_page_without_queries(self):
+        '''Закэшированная страница не читает ни сессию, ни пользователя'''
+        self.client.get(self.index)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.index)
+
+        self.assertContains(response, 'Пользователь: auth')
+
+    def test_profile_change_invalidates_user(self):
+        '''Изменение пользователя сразу видно в request.user'''
+        self.client.get(self.index)
+
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        response = self.client.get(reverse('posts:post_create'))
+
+        self.assertEqual(response.context['user'].first_name, 'Новое имя')
+
+    def test_password_change_logs_out(self):
+        '''Смена пароля завершает старые сессии, даже если кэш заполнен'''
+        self.client.get(self.index)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        fresh_client = Client()
+        fresh_client.force_login(user)
+        fresh_client.get(reverse('posts:post_create'))
+
+        response = self.client.get(reverse('posts:post_create'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_seen_by_other_process(self):
+        '''Выход и смена пароля видны кэшу другого процесса'''
+        other_process = SQLiteCache(
+            settings.CACHES['shared']['LOCATION'], {})
+        self.client.get(self.index)
+        session_key = (SessionStore.cache_key_prefix
+                       + self.client.session.session_key)
+        user_key = USER_KEY.format(self.user.pk)
+        self.assertIsNotNone(other_process.get(session_key))
+        self.assertIsNotNone(other_process.get(user_key))
+
+        self.client.logout()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+
+        self.assertIsNone(other_process.get(session_key))
+        self.assertIsNone(other_process.get(user_key))
+
+    def test_anonymous_has_no_session(self):
+        '''Гость на главной не создаёт и не читает сессию'''
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(self.index)
+
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(any('django_session' in query['sql']
+                             for query in queries))
@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import benchmark
+from ..urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(users=4, groups=2, posts=30, comments=20, follows=6)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_run_covers_every_route(self):
+        '''Замер выполняется для каждого маршрута posts.urls'''
+        results = benchmark.run(requests=2, cold=True)
+
+        self.assertEqual(set(results),
+                         {pattern.name for pattern in urlpatterns})
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries'], 0)
+
+    def test_percentile(self):
+        '''Перцентиль по методу ближайшего ранга'''
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_compare_flags_regressions(self):
+        '''Сравнение прогонов находит рост p95 и числа запросов'''
+        baseline = {'index': {'p95_ms': 10.0, 'queries': 3}}
+        current = {'index': {'p95_ms': 13.0, 'queries': 4}}
+
+        regressions = benchmark.compare(baseline, current, threshold=0.2)
+
+        self.assertEqual(
+            [metric for _, metric, _, _ in regressions],
+            ['p95_ms', 'queries'],
+        )
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
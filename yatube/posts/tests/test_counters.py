@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comment_counter(self):
+        '''Счётчик комментариев пересчитывает воркер пачкой'''
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ещё комментарий')
+
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(queue.work(), ('posts.count_comments', 2, 2))
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.comments_count, 2)
+
+        comment.delete()
+        queue.work()
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_post_edit_keeps_counter(self):
+        '''Сохранение поста не затирает счётчик комментариев'''
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        queue.work()
+
+        post.text = 'Изменённый пост'
+        post.save()
+        post.refresh_from_db()
+
+        self.assertEqual(post.comments_count, 1)
+
+    def test_author_stats(self):
+        '''Счётчики постов и подписок автора'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Второй пост')
+
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1)
+
+        Follow.objects.all().delete()
+
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0)
+
+    def test_reconcile_counters(self):
+        '''Команда reconcile_counters исправляет расхождения'''
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Post.objects.update(comments_count=7)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=0)
+        out = StringIO()
+
+        call_command('reconcile_counters', stdout=out)
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1)
+        self.assertIn('2', out.getvalue())
+
+    def test_list_has_no_per_post_queries(self):
+        '''Число запросов на главной не зависит от числа постов'''
+        client = Client()
+        with self.assertNumQueries(1):
+            client.get(reverse('posts:index'))
+        for i in range(5):
+            post = Post.objects.create(author=self.author, text=f'Пост {i}')
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+        queue.work()
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            response = client.get(reverse('posts:index'))
+
+        self.assertContains(response, 'Комментариев: 1', count=5)
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+def count_queries(queries):
+    return [query['sql'] for query in queries.captured_queries
+            if 'COUNT(*)' in query['sql']]
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class PaginatorCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for i in range(5):
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self, url, page=2):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': page})
+        return response, count_queries(queries)
+
+    def test_count_cached_until_posts_change(self):
+        '''Число записей считается один раз до нового поста'''
+        url = reverse('posts:group_list', args=['group'])
+        response, counts = self.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        self.assertEqual(len(counts), 1)
+
+        _, counts = self.get(url, page=3)
+        self.assertEqual(counts, [])
+
+        Post.objects.create(author=self.user, group=self.group, text='Ещё')
+        response, counts = self.get(url)
+
+        self.assertEqual(response.context['page_obj'].paginator.count, 6)
+        self.assertContains(response, 'Всего записей: 6')
+
+    def test_count_survives_comments_and_edits(self):
+        '''Комментарий и правка поста не сбрасывают число записей'''
+        url = reverse('posts:index')
+        self.get(url)
+        post = Post.objects.filter(group=self.group).last()
+
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        post.text = 'Исправлено'
+        post.save()
+        response, counts = self.get(url, page=3)
+
+        self.assertContains(response, 'Исправлено')
+        self.assertEqual(counts, [])
+
+        post.group = None
+        post.save()
+        _, counts = self.get(reverse('posts:group_list', args=['group']))
+        self.assertEqual(len(counts), 1)
+
+    def test_profile_uses_stats(self):
+        '''Профиль берёт число постов из статистики автора'''
+        response, counts = self.get(reverse('posts:profile',
+                                            args=['writer']))
+
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        self.assertEqual(counts, [])
+
+    @override_settings(PAGINATOR_ESTIMATE_FROM=3)
+    def test_estimate_only_for_display(self):
+        '''Для больших наборов оценка из sqlite_stat1 только выводится'''
+        call_command('sqlite_analyze', stdout=StringIO())
+
+        response, counts = self.get(reverse('posts:index'))
+
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(paginator.count, 4)
+        self.assertEqual(paginator.display_count, 5)
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 4', counts[0])
+        self.assertContains(response, 'Всего записей: ~5')
+
+    @override_settings(PAGINATOR_ESTIMATE_FROM=3)
+    def test_pages_past_bound(self):
+        '''Страницы за границей подсчёта открываются, пустая — нет'''
+        url = reverse('posts:index')
+
+        response, _ = self.get(url, page=3)
+        page_obj = response.context['page_obj']
+
+        self.assertEqual((page_obj.number, len(page_obj)), (3, 1))
+        self.assertFalse(page_obj.has_next())
+
+        response, _ = self.get(url, page=4)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_small_sets_skip_stats(self):
+        '''Небольшой набор не читает статистику SQLite'''
+        call_command('sqlite_analyze', stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'), {'page': 2})
+
+        self.assertFalse(any('sqlite_stat1' in query['sql']
+                             or 'sqlite_master' in query['sql']
+                             for query in queries.captured_queries))
@@ -0,0 +1,145 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core import db_router
+from core.management.commands.refresh_replicas import copy_database
+from core.middleware import ReadYourWritesMiddleware
+
+from ..models import AuthorStats, Follow, Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.replica = os.path.join(directory, 'replica.sqlite3')
+        open(self.replica, 'w').close()
+        patcher = mock.patch.object(
+            db_router, 'replica_files',
+            return_value={'replica_1': self.replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_until_write(self):
+        '''Чтение идёт на реплику, после записи — на основную базу'''
+        with db_router.routing(replicas=True):
+            self.assertEqual(router.db_for_read(Post), 'replica_1')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_primary_outside_requests_and_transactions(self):
+        '''Вне запроса и внутри транзакции читается основная база'''
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with db_router.routing(replicas=False):
+            self.assertEqual(router.db_for_read(Post), 'default')
+        with db_router.routing(replicas=True), transaction.atomic():
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_stale_replica_is_skipped(self):
+        '''Реплика, отставшая больше REPLICA_MAX_LAG, не читается'''
+        old = time.time() - settings.REPLICA_MAX_LAG - 1
+        os.utime(self.replica, (old, old))
+
+        with db_router.routing(replicas=True):
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_auth_and_sessions_read_primary(self):
+        '''Пользователи и сессии всегда читаются с основной базы'''
+        with db_router.routing(replicas=True):
+            self.assertEqual(router.db_for_read(get_user_model()),
+                             'default')
+            self.assertEqual(router.db_for_read(Post), 'replica_1')
+
+    def test_read_your_writes_cookie(self):
+        '''После записи пользователь какое-то время читает основную базу'''
+        def view(request):
+            if request.method == 'POST':
+                router.db_for_write(Post)
+            return HttpResponse(router.db_for_read(Post))
+
+        middleware = ReadYourWritesMiddleware(view)
+        factory = RequestFactory()
+        cookie = ReadYourWritesMiddleware.cookie_name
+
+        self.assertEqual(middleware(factory.get('/')).content, b'replica_1')
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies[cookie]['max-age'],
+                         settings.READ_YOUR_WRITES_SECONDS)
+        request = factory.get('/')
+        request.COOKIES[cookie] = '1'
+        self.assertEqual(middleware(request).content, b'default')
+
+    def test_cookie_for_writes_during_get(self):
+        '''Запись при GET, как подписка, переводит на основную базу'''
+        def view(request):
+            router.db_for_write(Follow)
+            return HttpResponse()
+
+        response = ReadYourWritesMiddleware(view)(RequestFactory().get('/'))
+
+        self.assertIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+    def test_follow_link_sets_cookie(self):
+        '''Подписка по ссылке выдаёт cookie чтения с основной базы'''
+        User = get_user_model()
+        User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(User.objects.create_user(username='reader'))
+
+        response = client.get(reverse('posts:profile_follow',
+                                      args=['author']))
+
+        self.assertIn(ReadYourWritesMiddleware.cookie_name, response.cookies)
+
+    def test_no_cookie_for_bookkeeping_writes(self):
+        '''Служебная запись при GET не переводит на основную базу'''
+        def view(request):
+            router.db_for_write(AuthorStats)
+            return HttpResponse(router.db_for_read(Post))
+
+        response = ReadYourWritesMiddleware(view)(RequestFactory().get('/'))
+
+        self.assertEqual(response.content, b'replica_1')
+        self.assertNotIn(ReadYourWritesMiddleware.cookie_name,
+                         response.cookies)
+
+
+class RefreshReplicasTests(TestCase):
+    def test_copy_database(self):
+        '''Реплика — полная копия файла основной базы'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as connection:
+            connection.execute('CREATE TABLE post (text TEXT)')
+            connection.execute("INSERT INTO post VALUES ('Пост')")
+        connection.close()
+
+        copy_database(source, target)
+
+        replica = sqlite3.connect(target)
+        self.addCleanup(replica.close)
+        self.assertEqual(replica.execute('SELECT text FROM post').fetchall(),
+                         [('Пост',)])
+
+        with sqlite3.connect(source) as connection:
+            connection.execute("INSERT INTO post VALUES ('Ещё')")
+        connection.close()
+        copy_database(source, target)
+
+        # Уже открытое соединение видит обновление.
+        self.assertEqual(
+            replica.execute('SELECT count(*) FROM post').fetchone(), (2,))
@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        cls.image_post = Post.objects.create(
+            author=cls.user, text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'))
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(post=cls.posts[0], author=cls.user,
+                               text='Свой комментарий')
+        Comment.objects.create(post=cls.posts[0], author=cls.other,
+                               text='Чужой комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_jsonl_export(self):
+        '''Выгрузка содержит только посты и комментарии пользователя'''
+        response = self.client.get(reverse('posts:export'))
+
+        self.assertIn('writer.jsonl', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', 'Пост 0'), ('post', 'Пост 1'), ('post', 'Пост 2'),
+             ('post', 'С картинкой'), ('comment', 'Свой комментарий')])
+
+    def test_zip_export(self):
+        '''Архив с картинками собирается потоком'''
+        response = self.client.get(reverse('posts:export'), {'images': 1})
+
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as package:
+            self.assertEqual(package.namelist(),
+                             ['posts.jsonl', self.image_post.image.name])
+            self.assertEqual(package.read(self.image_post.image.name),
+                             SMALL_GIF)
+            self.assertEqual(
+                len(package.read('posts.jsonl').splitlines()), 5)
+
+    def test_export_command(self):
+        '''Команда пишет выгрузку в файл'''
+        path = os.path.join(TEMP_MEDIA_ROOT, 'writer.jsonl')
+
+        call_command('export_posts', 'writer', output=path)
+
+        with open(path, encoding='utf-8') as dump:
+            self.assertEqual(len(dump.readlines()), 5)
+
+    def test_export_requires_login(self):
+        '''Гость перенаправляется на страницу входа'''
+        response = Client().get(reverse('posts:export'))
+
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feed
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follow_index = reverse('posts:follow_index')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_posts(self):
+        return list(
+            FeedEntry.objects.filter(user=self.reader)
+            .values_list('post_id', flat=True)
+        )
+
+    def test_new_post_goes_to_followers(self):
+        '''Новый пост записывается в ленты подписчиков'''
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.other, text='Чужой пост')
+
+        self.assertEqual(self.feed_posts(), [post.id])
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        '''Подписка заполняет ленту, отписка очищает её'''
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+        self.client.get(reverse('posts:profile_follow', args=['writer']))
+
+        self.assertEqual(self.feed_posts(),
+                         [post.id for post in reversed(posts)])
+
+        self.client.get(reverse('posts:profile_unfollow', args=['writer']))
+
+        self.assertEqual(self.feed_posts(), [])
+
+    @override_settings(FEED_MAX_ENTRIES=2)
+    def test_feed_is_capped(self):
+        '''В ленте хранится не больше FEED_MAX_ENTRIES записей'''
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+
+        self.assertEqual(self.feed_posts(), [posts[3].id, posts[2].id])
+
+    @override_settings(FEED_MAX_ENTRIES=1)
+    def test_fan_out_trims_all_feeds_at_once(self):
+        '''Ленты всех подписчиков обрезаются одним запросом'''
+        for user in (self.reader, self.other):
+            Follow.objects.create(user=user, author=self.author)
+        Post.objects.create(author=self.author, text='Старый пост')
+        post = Post.objects.create(author=self.author, text='Новый пост')
+
+        with CaptureQueriesContext(connection) as queries:
+            feed.fan_out(post)
+
+        # Подписчики, вставка и одна обрезка на всех.
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('post_id', flat=True)),
+            [post.id, post.id])
+
+    def test_follow_index_reads_feed(self):
+        '''Лента подписок строится по материализованной ленте'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост в ленте')
+
+        response = self.client.get(self.follow_index)
+
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_rebuild_feed_command(self):
+        '''Команда rebuild_feed восстанавливает ленту'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        FeedEntry.objects.all().delete()
+
+        out = StringIO()
+
+        call_command('rebuild_feed', stdout=out)
+
+        self.assertEqual(self.feed_posts(), [post.id])
+        self.assertIn('1', out.getvalue())
@@ -1,3 +1,4 @@
+import io
 import shutil
 import tempfile
 
@@ -8,7 +9,9 @@ from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts.forms import PostForm
 from posts.models import Comment, Group, Post
 
 User = get_user_model()
@@ -137,3 +140,85 @@ class PostCreateFormTests(TestCase):
 
         self.assertEqual(response.status_code, HTTPStatus.FOUND)
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=100,
+                   POST_IMAGE_FORMAT='JPEG')
+class PostImageNormalizationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @staticmethod
+    def upload(size, mode='RGB', image_format='JPEG', orientation=None):
+        output = io.BytesIO()
+        image = Image.new(mode, size, 'red')
+        options = {}
+        if orientation is not None:
+            exif = image.getexif()
+            exif[0x0112] = orientation
+            options['exif'] = exif.tobytes()
+        image.save(output, image_format, **options)
+        return SimpleUploadedFile(f'photo.{image_format.lower()}',
+                                  output.getvalue())
+
+    def clean_image(self, upload):
+        form = PostForm(data={'text': 'Текст'}, files={'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        return Image.open(form.cleaned_data['image'])
+
+    def test_image_is_downscaled_and_rotated(self):
+        '''Картинка поворачивается по EXIF, уменьшается и теряет EXIF'''
+        image = self.clean_image(
+            self.upload((400, 200), orientation=6))
+
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (50, 100))
+        self.assertNotIn(0x0112, image.getexif())
+
+    def test_transparent_image_stays_png(self):
+        '''Прозрачная картинка без WebP сохраняется в PNG'''
+        image = self.clean_image(
+            self.upload((20, 20), mode='RGBA', image_format='PNG'))
+
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_is_rejected(self):
+        '''Слишком большое по пикселям изображение отклоняется'''
+        form = PostForm(data={'text': 'Текст'},
+                        files={'image': self.upload((20, 20))})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def animation(self, size):
+        output = io.BytesIO()
+        frames = [Image.new('P', size, color) for color in (1, 2)]
+        frames[0].save(output, 'GIF', save_all=True,
+                       append_images=frames[1:])
+        return SimpleUploadedFile('animation.gif', output.getvalue())
+
+    def test_animation_is_kept(self):
+        '''Небольшая анимация сохраняется без перекодирования'''
+        image = self.clean_image(self.animation((50, 50)))
+
+        self.assertEqual(image.format, 'GIF')
+        self.assertTrue(image.is_animated)
+
+    def test_oversize_animation_is_rejected(self):
+        '''Анимация больше допустимых размеров или веса отклоняется'''
+        cases = (
+            ({}, (200, 50), 'animation_too_large'),
+            ({'POST_IMAGE_MAX_ANIMATED_BYTES': 10}, (50, 50),
+             'animation_too_heavy'),
+        )
+        for options, size, code in cases:
+            with self.subTest(code=code), self.settings(**options):
+                form = PostForm(data={'text': 'Текст'},
+                                files={'image': self.animation(size)})
+
+                self.assertFalse(form.is_valid())
+                self.assertTrue(form.has_error('image', code))
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import importer
+from ..models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+RECORDS = [
+    {'type': 'post', 'id': 1, 'author': 'writer', 'group': 'cats',
+     'text': 'Первый пост', 'pub_date': '2020-01-01T10:00:00Z'},
+    {'type': 'post', 'id': 2, 'author': 'writer',
+     'text': 'Второй пост', 'pub_date': '2020-01-02T10:00:00Z'},
+    {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+    {'type': 'comment', 'post': 1, 'author': 'reader',
+     'text': 'Комментарий', 'created': '2020-01-03T10:00:00Z'},
+    {'type': 'comment', 'post': 99, 'author': 'reader', 'text': 'Потерян'},
+]
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'dump.jsonl')
+
+    def write(self, records, mode='w'):
+        with open(self.path, mode, encoding='utf-8') as dump:
+            for record in records:
+                dump.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def load(self, path=None):
+        call_command('import_posts', path or self.path, batch_size=2,
+                     stdout=StringIO())
+
+    def test_import(self):
+        '''Импорт создаёт записи, сохраняет даты и пересобирает ленты'''
+        self.write(RECORDS)
+
+        self.load()
+
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='Первый пост')
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.pub_date,
+                         datetime(2020, 1, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().post, post)
+        reader = User.objects.get(username='reader')
+        self.assertTrue(Follow.objects.filter(user=reader).exists())
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 2)
+        self.assertEqual(reader.stats.following_count, 1)
+
+    def test_resume(self):
+        '''Повторный запуск продолжает с контрольной точки без дублей'''
+        self.write(RECORDS[:2])
+        self.load()
+        self.write(RECORDS[2:], mode='a')
+
+        self.load()
+        self.load()
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_csv(self):
+        '''CSV читается по заголовку'''
+        path = os.path.join(self.directory, 'dump.csv')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('type,id,author,group,text,pub_date\n'
+                       'post,1,writer,,"Пост, из CSV",\n')
+
+        self.load(path)
+
+        self.assertEqual(Post.objects.get().text, 'Пост, из CSV')
+
+    def test_finish_after_crash(self):
+        '''После сбоя ленты пересобираются и для пачек до перезапуска'''
+        self.write([RECORDS[2], RECORDS[0], RECORDS[1]])
+        records = importer.read_jsonl(self.path)
+        crashed = importer.Importer(self.path, batch_size=2)
+        # Упали после последней пачки, но до finish().
+        list(crashed.run(records))
+
+        self.load()
+
+        reader = User.objects.get(username='reader')
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 2)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_csv_resume(self):
+        '''CSV продолжается с байтовой позиции, в том числе после
+        поля с переводом строки'''
+        path = os.path.join(self.directory, 'dump.csv')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('type,id,author,text\n'
+                       'post,1,writer,"Первая\nстрока"\n'
+                       'post,2,writer,Второй\n')
+        rows = list(importer.read_csv(path))
+
+        resumed = list(importer.read_csv(path, rows[0][0]))
+
+        self.assertEqual(rows[0][1]['text'], 'Первая\nстрока')
+        self.assertEqual(resumed, rows[1:])
+        self.assertEqual(resumed[0][1]['id'], '2')
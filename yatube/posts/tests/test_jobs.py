@@ -0,0 +1,129 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+
+from ..models import FeedEntry, Follow, Post, User
+
+calls = []
+
+
+@queue.handler('tests.batch', batch=True)
+def batch_handler(payloads):
+    calls.append([payload['number'] for payload in payloads])
+
+
+@queue.handler('tests.flaky')
+def flaky_handler(number):
+    if number < 0:
+        raise ValueError('Отрицательное число')
+    calls.append(number)
+
+
+@override_settings(JOBS_RETRY_DELAY=10, JOBS_MAX_ATTEMPTS=2)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_of_one_kind_run_as_batch(self):
+        '''Задачи одного вида выполняются пачкой и удаляются'''
+        for number in range(3):
+            queue.enqueue('tests.batch', number=number)
+        queue.enqueue('tests.flaky', number=5)
+
+        self.assertEqual(queue.work(), ('tests.batch', 3, 3))
+        self.assertEqual(queue.work(), ('tests.flaky', 1, 1))
+        self.assertEqual(queue.work(), (None, 0, 0))
+        self.assertEqual(calls, [[0, 1, 2], 5])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_retried_with_backoff(self):
+        '''Упавшая задача откладывается, а после лимита попыток бросается'''
+        queue.enqueue('tests.flaky', number=-1)
+        queue.enqueue('tests.flaky', number=1)
+
+        before = timezone.now()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(queue.work(), ('tests.flaky', 2, 1))
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreaterEqual((job.run_at - before).total_seconds(), 10)
+        self.assertEqual(queue.work(), (None, 0, 0))
+
+        Job.objects.update(run_at=before)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.work()
+
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_stale_worker_leaves_reclaimed_jobs(self):
+        '''Воркер с истёкшей блокировкой не трогает чужие задачи'''
+        queue.enqueue('tests.batch', number=1)
+        queue.enqueue('tests.flaky', number=-1)
+        kind, jobs = queue.claim()
+        Job.objects.filter(kind=kind).update(locked_by='другой воркер')
+
+        self.assertEqual(queue.run(kind, jobs), 1)
+        self.assertTrue(Job.objects.filter(kind=kind).exists())
+
+        kind, jobs = queue.claim()
+        Job.objects.filter(kind=kind).update(locked_by='другой воркер')
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run(kind, jobs)
+
+        self.assertEqual(Job.objects.get(kind=kind).attempts, 0)
+
+    def test_stats(self):
+        '''Статистика показывает глубину очереди и задержку'''
+        queue.enqueue('tests.batch', number=1)
+        queue.enqueue('tests.batch', delay=60, number=2)
+        Job.objects.filter(run_at__lte=timezone.now()).update(
+            run_at=timezone.now() - timezone.timedelta(seconds=30))
+
+        row, = queue.stats()
+
+        self.assertEqual((row['kind'], row['queued'], row['ready']),
+                         ('tests.batch', 2, 1))
+        self.assertGreaterEqual(row['latency'], 30)
+
+        out = StringIO()
+        call_command('job_stats', stdout=out)
+        self.assertIn('в очереди 2', out.getvalue())
+
+
+class QueuedFanOutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(3)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+    @override_settings(FEED_INLINE_FAN_OUT=2)
+    def test_large_fan_out_goes_to_worker(self):
+        '''Посты популярного автора раскладываются по лентам воркером'''
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(2)]
+
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(Job.objects.filter(kind='posts.fan_out').count(), 2)
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+        for post in posts:
+            self.assertEqual(FeedEntry.objects.filter(post=post).count(), 3)
+        self.assertFalse(Job.objects.exists())
+
+    def test_small_fan_out_inline(self):
+        '''Немногим подписчикам пост попадает в ленту сразу'''
+        post = Post.objects.create(author=self.author, text='Пост')
+
+        self.assertEqual(FeedEntry.objects.filter(post=post).count(), 3)
+        self.assertFalse(Job.objects.exists())
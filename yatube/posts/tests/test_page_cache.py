@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from ..caching import bump
+from ..middleware import AnonymousPageCacheMiddleware
+from ..models import Group, Post, User
+
+
+@override_settings(ANONYMOUS_CACHE_BACKGROUND_REFRESH=False)
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Пост')
+        cls.index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_hit_skips_view(self):
+        '''Повторный запрос гостя отдаётся из кэша без обращения к базе'''
+        self.guest.get(self.index)
+
+        with self.assertNumQueries(0):
+            response = self.guest.get(self.index)
+
+        self.assertIsNone(response.context)
+        self.assertContains(response, 'Пост')
+
+    def test_query_string_is_normalized(self):
+        '''Порядок параметров и utm-метки не создают новых записей'''
+        self.guest.get(self.index, {'page': 1, 'utm_source': 'mail'})
+
+        response = self.guest.get(self.index + '?utm_medium=x&page=1')
+
+        self.assertIsNone(response.context)
+
+    def test_stale_copy_while_refreshing(self):
+        '''Пока страница пересобирается, остальные получают старую копию'''
+        self.guest.get(self.index)
+        bump('all')
+        with mock.patch('posts.middleware.cache.add', return_value=False):
+            stale = self.guest.get(self.index)
+
+        fresh = self.guest.get(self.index)
+
+        self.assertIsNone(stale.context)
+        self.assertIsNotNone(fresh.context)
+
+    def test_expired_copy_refreshed(self):
+        '''Просроченная копия отдаётся, а страница собирается заново'''
+        with override_settings(ANONYMOUS_CACHE_FRESH_SECONDS=-1):
+            self.guest.get(self.index)
+
+        with mock.patch.object(AnonymousPageCacheMiddleware,
+                               'store') as store:
+            response = self.guest.get(self.index)
+
+        self.assertIsNone(response.context)
+        store.assert_called_once()
+
+    @override_settings(ANONYMOUS_CACHE_BACKGROUND_REFRESH=True)
+    def test_background_refresh_uses_pool(self):
+        '''Фоновое обновление идёт в пуле и закрывает соединения'''
+        with override_settings(ANONYMOUS_CACHE_FRESH_SECONDS=-1):
+            self.guest.get(self.index)
+        executor = mock.Mock()
+
+        with mock.patch('posts.middleware._executor_instance',
+                        return_value=executor):
+            self.guest.get(self.index)
+        task, *args = executor.submit.call_args[0]
+        with mock.patch('posts.middleware.close_old_connections') as close:
+            task(*args)
+
+        self.assertEqual(close.call_count, 2)
+        self.assertIsNone(self.guest.get(self.index).context)
+
+    def test_session_bypasses_cache(self):
+        '''Пользователь с сессией всегда получает страницу от view'''
+        self.guest.get(self.index)
+        client = Client()
+        client.force_login(self.user)
+
+        response = client.get(self.index)
+
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'auth')
+
+    def test_no_csrf_pages_and_cookies(self):
+        '''Страницы с CSRF-токеном и Set-Cookie в кэш не попадают'''
+        request = RequestFactory().get(self.index)
+        request.META['CSRF_COOKIE_USED'] = True
+        response = HttpResponse('Форма')
+        response.set_cookie('visited', '1')
+        middleware = AnonymousPageCacheMiddleware(lambda request: response)
+
+        middleware.store(request, response, 'page', '1')
+        self.assertIsNone(cache.get('page'))
+
+        del request.META['CSRF_COOKIE_USED']
+        middleware.store(request, response, 'page', '1')
+        headers = dict(cache.get('page')['headers'])
+        self.assertNotIn('Set-Cookie', headers)
+
+    def test_conditional_get_on_hit(self):
+        '''Закэшированная страница отвечает 304 на If-None-Match'''
+        etag = self.guest.get(self.index)['ETag']
+
+        response = self.guest.get(self.index, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
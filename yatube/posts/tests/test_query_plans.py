@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryPlanTests(TestCase):
+    '''Запросы страниц используют индексы без полного сканирования'''
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queries):
+        for query in queries.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for step in self.explain(query['sql']):
+                self.assertNotIn('TEMP B-TREE', step, query['sql'])
+                if step.startswith('SCAN'):
+                    self.assertIn('INDEX', step, query['sql'])
+
+    def test_views_use_indexes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertIndexed(queries)
+
+    def test_fan_out_uses_reverse_follow_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.create(author=self.author, text='Новый пост')
+
+        self.assertIndexed(queries)
+        self.assertTrue(any(
+            'follow_author_user_idx' in step
+            for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            for step in self.explain(query['sql'])
+        ))
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Группа о котиках')
+        cls.cat_post = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Котики любят спать. Котики любят есть.')
+        cls.dog_post = Post.objects.create(
+            author=cls.other, text='Собаки любят гулять')
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_ranks_matches(self):
+        '''Поиск находит посты и сортирует их по релевантности'''
+        Post.objects.create(author=self.other, text='Котики и собаки')
+
+        results = list(search.search('котики'))
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], self.cat_post)
+
+    def test_index_follows_edits_and_deletes(self):
+        '''Индекс обновляется при изменении и удалении поста'''
+        self.dog_post.text = 'Хомяки любят гулять'
+        self.dog_post.save()
+
+        self.assertEqual(list(search.search('хомяки')), [self.dog_post])
+        self.assertEqual(list(search.search('собаки')), [])
+
+        self.dog_post.delete()
+
+        self.assertEqual(list(search.search('хомяки')), [])
+
+    def test_query_syntax_is_escaped(self):
+        '''Спецсимволы FTS5 в запросе не ломают поиск'''
+        self.assertEqual(list(search.search('котики" (*')),
+                         [self.cat_post])
+        self.assertEqual(list(search.search('!!!')), [])
+
+    def test_search_view_filters(self):
+        '''Страница поиска фильтрует по группе и автору'''
+        response = self.client.get(self.url, {'q': 'любят'})
+
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+        for params in ({'group': 'cats'}, {'author': 'writer'}):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    self.url, {'q': 'любят', **params})
+                self.assertEqual(list(response.context['page_obj']),
+                                 [self.cat_post])
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке использует полнотекстовый индекс'''
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'})
+
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dog_post])
+
+    def test_search_pages_by_cursor(self):
+        '''Результаты поиска листаются курсором без повторов'''
+        Post.objects.bulk_create(
+            Post(author=self.other, text=f'Котики номер {number}')
+            for number in range(settings.POSTS_PER_PAGE + 3))
+
+        seen = []
+        params = {'q': 'котики'}
+        while True:
+            page = self.client.get(self.url, params).context['page_obj']
+            seen.extend(post.pk for post in page)
+            if not page.next_cursor:
+                break
+            params['cursor'] = page.next_cursor
+
+        expected = [post.pk for post in search.search('котики')]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), settings.POSTS_PER_PAGE + 4)
+
+    def test_search_matches_once(self):
+        '''Страница поиска выполняет MATCH один раз, без подзапросов'''
+        first = self.client.get(self.url, {'q': 'любят'}).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'q': 'любят',
+                                       'cursor': first.next_cursor or ''})
+        searches = [query['sql'] for query in queries.captured_queries
+                    if search.FTS_TABLE in query['sql']]
+        self.assertEqual(len(searches), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + searches[0])
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertFalse(
+            [step for step in plan if 'SUBQUERY' in step], plan)
+        self.assertEqual(
+            len([step for step in plan if search.FTS_TABLE in step]), 1)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.signals import configure_sqlite
+from core.sqlite import measure_concurrency
+
+
+class SqliteSettingsTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        '''Настройки SQLite выставляются на каждом соединении'''
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0],
+                             settings.SQLITE_PRAGMAS['busy_timeout'])
+
+    def test_wal_only_in_production(self):
+        '''WAL и прочие настройки файла включаются только в боевом
+        профиле'''
+        self.assertFalse(settings.PRODUCTION)
+        self.assertNotIn('journal_mode', settings.SQLITE_PRAGMAS)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_replicas_skipped(self):
+        '''Соединения с репликами не настраиваются'''
+        replica = mock.Mock(vendor='sqlite', alias='replica_1')
+
+        configure_sqlite(sender=None, connection=replica)
+
+        replica.cursor.assert_not_called()
+
+    def test_concurrency_benchmark(self):
+        '''Замер возвращает пропускную способность чтения и записи'''
+        with tempfile.TemporaryDirectory() as directory:
+            result = measure_concurrency(
+                os.path.join(directory, 'bench.sqlite3'),
+                settings.SQLITE_PRODUCTION_PRAGMAS,
+                readers=2, writers=1, seconds=0.2)
+
+        self.assertGreater(result['reads'], 0)
+        self.assertGreater(result['writes'], 0)
+        self.assertEqual(result['errors'], 0)
@@ -0,0 +1,90 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import throttle
+from ..models import Comment, Post, User
+
+
+@override_settings(WRITE_THROTTLE_RATES={
+    'post': {'user': (2, 60), 'ip': (3, 60)},
+    'comment': {'user': (2, 60), 'ip': (3, 60)},
+})
+class WriteThrottleTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comment_url = reverse('posts:add_comment', args=[cls.post.id])
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def comment(self, client, text='Комментарий'):
+        return client.post(self.comment_url, {'text': text})
+
+    def test_user_limit(self):
+        '''Сверх лимита пользователь получает 429 с Retry-After'''
+        for _ in range(2):
+            self.assertEqual(self.comment(self.client).status_code, 302)
+
+        response = self.comment(self.client, 'Лишний')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(Comment.objects.filter(text='Лишний').exists())
+
+    def test_ip_limit(self):
+        '''Лимит на IP действует для всех пользователей с этого адреса'''
+        other = Client()
+        other.force_login(self.other)
+        self.comment(self.client)
+        self.comment(self.client)
+        self.assertEqual(self.comment(other).status_code, 302)
+
+        self.assertEqual(self.comment(other).status_code, 429)
+
+    def test_refusal_keeps_other_buckets(self):
+        '''Отказ по одной корзине не расходует остальные'''
+        other = Client()
+        other.force_login(self.other)
+        for _ in range(3):
+            self.comment(self.client)
+
+        self.assertEqual(self.comment(other).status_code, 302)
+        self.assertEqual(self.comment(other).status_code, 429)
+
+    def test_bucket_refills(self):
+        '''Через период корзина снова полна'''
+        for _ in range(3):
+            self.comment(self.client)
+        later = time.time() + 60
+
+        with mock.patch('posts.throttle.time.time', return_value=later):
+            self.assertEqual(self.comment(self.client).status_code, 302)
+
+    def test_check_skips_database(self):
+        '''Проверка лимита не обращается к базе'''
+        request = RequestFactory().post(self.comment_url)
+        request.user = self.user
+
+        with self.assertNumQueries(0):
+            self.assertEqual(throttle.consume(request, 'comment'), 0)
+
+    def test_scopes_and_reads_are_separate(self):
+        '''GET и другие виды записи лимит не расходуют'''
+        for _ in range(2):
+            self.client.get(reverse('posts:post_create'))
+            self.comment(self.client)
+
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый пост'})
+
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        thumbnails.forget()
+        self.addCleanup(thumbnails.forget)
+
+    def test_fallback_to_original_image(self):
+        '''Пока миниатюры нет, показывается исходное изображение'''
+        response = Client().get(reverse('posts:index'))
+
+        self.assertContains(response, self.post.image.url)
+
+    def test_queue_generates_thumbnail(self):
+        '''После обработки очереди страница показывает миниатюру'''
+        self.assertTrue(thumbnails.queue(self.post.image.name))
+
+        image = thumbnails.lookup(self.post.image, 'card')
+        response = Client().get(reverse('posts:index'))
+
+        self.assertNotEqual(image, self.post.image)
+        self.assertEqual((image.width, image.height), (960, 339))
+        self.assertContains(response, image.url)
+
+    @override_settings(THUMBNAIL_WORKERS=1, THUMBNAIL_QUEUE_LIMIT=0)
+    def test_queue_skips_when_worker_is_behind(self):
+        '''Переполненная очередь не блокирует запрос'''
+        self.assertFalse(thumbnails.queue(self.post.image.name))
+
+    def test_page_resolves_thumbnails_at_once(self):
+        '''Миниатюры страницы ищутся одним запросом, затем из памяти'''
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}',
+                image=SimpleUploadedFile(f'small_{i}.gif', SMALL_GIF,
+                                         'image/gif'))
+            for i in range(3)
+        ]
+        thumbnails.queue(posts[0].image.name)
+        images = [post.image for post in posts]
+
+        with CaptureQueriesContext(connection) as queries:
+            found = thumbnails.lookup_many(images, 'card')
+        self.assertEqual(len(queries), 1)
+        self.assertNotEqual(found[0], images[0])
+        self.assertEqual(found[1:], images[1:])
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(thumbnails.lookup_many(images, 'card'), found)
+        with self.assertNumQueries(0):
+            thumbnails.lookup_many(images[:1], 'card')
+
+    def test_miss_cached_until_thumbnail_generated(self):
+        '''Промах кэшируется, но готовая миниатюра сразу видна на странице'''
+        index = reverse('posts:index')
+        client = Client()
+        client.force_login(self.user)
+        self.assertContains(client.get(index), self.post.image.url)
+        thumbnails.forget()
+        with self.assertNumQueries(0):
+            thumbnails.lookup(self.post.image, 'card')
+
+        thumbnails.generate(self.post.image.name)
+
+        image = thumbnails.lookup(self.post.image, 'card')
+        self.assertNotEqual(image, self.post.image)
+        self.assertContains(client.get(index), image.url)
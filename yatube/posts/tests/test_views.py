@@ -6,10 +6,16 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from core.cache import SQLiteCache
+from jobs import queue
+
+from .. import caching, follows
+from ..models import Comment, Follow, Group, Post, User
 
 User = get_user_model()
 
@@ -205,6 +211,7 @@ class PaginatorViewsTest(TestCase):
 
     def setUp(self):
         self.client = Client()
+        cache.clear()
 
     def test_first_page_contains_ten_records(self):
         '''Тест первой страницы'''
@@ -228,6 +235,47 @@ class PaginatorViewsTest(TestCase):
             3
         )
 
+    def test_cursor_pages(self):
+        '''Тест переходов по курсору вперёд и назад'''
+        first_page = self.client.get(self.index).context['page_obj']
+
+        self.assertIsNone(first_page.previous_cursor)
+        self.assertIsNotNone(first_page.next_cursor)
+
+        response = self.client.get(
+            self.index, {'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+
+        self.assertEqual(len(second_page), 3)
+        self.assertIsNone(second_page.next_cursor)
+        self.assertContains(response, second_page.previous_cursor)
+
+        response = self.client.get(
+            self.index, {'cursor': second_page.previous_cursor})
+
+        self.assertEqual(list(response.context['page_obj']),
+                         list(first_page))
+
+    def test_cursor_page_query_count(self):
+        '''Страница по курсору не выполняет COUNT(*)'''
+        first_page = self.client.get(self.index).context['page_obj']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.index, {'cursor': first_page.next_cursor})
+
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_invalid_cursor(self):
+        '''Некорректный курсор открывает первую страницу'''
+        response = self.client.get(self.index, {'cursor': 'broken'})
+
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.POSTS_PER_PAGE
+        )
+
 
 class CacheTests(TestCase):
     @classmethod
@@ -243,25 +291,240 @@ class CacheTests(TestCase):
         self.user = User.objects.create_user(username='bot')
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
+        cache.clear()
 
     def test_cache_index(self):
         '''Тест кэширования страницы index.html'''
-        reponse_before_cache = self.authorized_client.get(self.index)
+        reponse_before_cache = self.guest_client.get(self.index)
+
+        with self.assertNumQueries(0):
+            reponse_cached = self.guest_client.get(self.index)
+
+        self.assertEqual(reponse_before_cache.content, reponse_cached.content)
+
+    def test_cache_invalidated_on_change(self):
+        '''Изменения постов сразу видны на закэшированных страницах'''
+        self.authorized_client.get(self.index)
 
         post_1 = Post.objects.get(pk=1)
         post_1.text = 'Измененный текст'
         post_1.save()
 
-        reponse_cached = self.authorized_client.get(self.index)
+        response = self.authorized_client.get(self.index)
 
-        self.assertEqual(reponse_before_cache.content, reponse_cached.content)
+        self.assertContains(response, 'Измененный текст')
+
+        Post.objects.create(author=self.user, text='Совсем новый пост')
+        response = self.authorized_client.get(self.index)
+
+        self.assertContains(response, 'Совсем новый пост')
+
+    def test_renamed_group_old_address(self):
+        '''После смены слага старый адрес группы не отдаётся из кэша'''
+        group = Group.objects.create(title='Группа', slug='old-slug',
+                                     description='Описание')
+        old_url = reverse('posts:group_list', args=['old-slug'])
+        self.assertEqual(self.authorized_client.get(old_url).status_code,
+                         200)
+
+        group.slug = 'new-slug'
+        group.save()
+
+        self.assertEqual(self.authorized_client.get(old_url).status_code,
+                         404)
+
+    def test_renamed_author_on_cards(self):
+        '''После смены имени карточки постов не отдаются из кэша'''
+        self.authorized_client.get(self.index)
+        author = self.post.author
+        author.username = 'new_name'
+        author.save()
+        other_client = Client()
+        other_client.force_login(User.objects.create_user(username='other'))
+
+        response = other_client.get(self.index)
+
+        self.assertContains(response, '@new_name')
+        self.assertNotContains(response, 'test_name')
+
+    def test_renamed_author_on_lists(self):
+        '''После смены имени лента и группа не отдают старое имя из кэша'''
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        Post.objects.create(author=self.post.author, group=group,
+                            text='Пост в группе')
+        # Лента показывает @username, страница группы — полное имя.
+        expected = {
+            self.index: '@new_name',
+            reverse('posts:group_list', args=['group']): 'Автор: Новое Имя',
+        }
+        for url in expected:
+            self.guest_client.get(url)
+        author = self.post.author
+        author.username = 'new_name'
+        author.first_name, author.last_name = 'Новое', 'Имя'
+        author.save()
+
+        for url, text in expected.items():
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_renamed_author_old_address(self):
+        '''После смены имени старый профиль не отдаётся из кэша'''
+        old_url = reverse('posts:profile', args=['bot'])
+        self.authorized_client.get(old_url)
+
+        self.user.username = 'renamed'
+        self.user.save()
 
+        self.assertEqual(self.authorized_client.get(old_url).status_code,
+                         404)
+
+    def test_generations_shared_between_processes(self):
+        '''Смену поколения видит кэш другого процесса'''
+        other_process = SQLiteCache(
+            settings.CACHES['shared']['LOCATION'], {})
+        key = caching._key(caching.GENERATION_KEY, 'all')
+        before = caching.generations('all')['all']
+        self.assertEqual(other_process.get(key), before)
+
+        Post.objects.create(author=self.user, text='Новый пост')
+
+        self.assertNotEqual(other_process.get(key), before)
+
+    def test_cache_is_per_user(self):
+        '''Кэш страницы не смешивает разных пользователей'''
+        self.authorized_client.get(self.index)
+
+        response = self.guest_client.get(self.index)
+
+        self.assertNotContains(response, 'Пользователь: bot')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.index = reverse('posts:index')
+        cls.detail = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        self.client = Client()
         cache.clear()
 
-        response_third_cache = self.authorized_client.get(self.index)
+    def test_not_modified_without_queries(self):
+        '''Повторный запрос с ETag получает 304 без обращений к БД'''
+        for url in (self.index, self.detail):
+            etag = self.client.get(url)['ETag']
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, 304)
+
+    def test_last_modified(self):
+        '''If-Modified-Since сравнивается со временем изменения'''
+        modified = self.client.get(self.index)['Last-Modified']
 
-        self.assertNotEqual(reponse_before_cache.content,
-                            response_third_cache.content)
+        response = self.client.get(
+            self.index, HTTP_IF_MODIFIED_SINCE=modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_detail_etag(self):
+        '''Новый комментарий меняет ETag страницы поста'''
+        etag = self.client.get(self.detail)['ETag']
+
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_no_last_modified_for_users(self):
+        '''Пользователь не получает 304 по If-Modified-Since гостя'''
+        modified = self.client.get(self.index)['Last-Modified']
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            self.index, HTTP_IF_MODIFIED_SINCE=modified)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_author_rename_changes_detail_etag(self):
+        '''Смена имени автора меняет ETag страницы поста'''
+        etag = self.client.get(self.detail)['ETag']
+
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое имя'
+        user.save()
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_is_per_user(self):
+        '''ETag различается для гостя и пользователя'''
+        etag = self.client.get(self.index)['ETag']
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.index, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        cls.index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.guest_client = Client()
+
+    def test_card_is_shared_between_users(self):
+        '''Карточка рендерится один раз, кнопка правки — только автору'''
+        response = self.author_client.get(self.index)
+        self.assertTemplateUsed(response, 'includes/post_card.html')
+        self.assertContains(response, 'Редактировать')
+
+        response = self.guest_client.get(self.index)
+
+        self.assertTemplateNotUsed(response, 'includes/post_card.html')
+        self.assertContains(response, 'Пост')
+        self.assertNotContains(response, 'Редактировать')
+
+    def test_card_follows_changes(self):
+        '''Карточка обновляется при правке, комментарии и смене группы'''
+        self.guest_client.get(self.index)
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий')
+        queue.work()
+        self.assertContains(self.guest_client.get(self.index),
+                            'Комментариев: 1')
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.guest_client.get(self.index),
+                            '#Новое название')
+
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.guest_client.get(self.index),
+                            'Исправленный пост')
 
 
 class FollowTests(TestCase):
@@ -287,6 +550,7 @@ class FollowTests(TestCase):
         )
         self.client_auth_follower.force_login(self.user_follower)
         self.client_auth_following.force_login(self.user_following)
+        cache.clear()
 
     def test_follow(self):
         '''Тест подписки'''
@@ -301,6 +565,34 @@ class FollowTests(TestCase):
 
         self.assertEqual(Follow.objects.all().count(), 0)
 
+    def test_follow_once(self):
+        '''Повторная подписка не создаёт вторую запись'''
+        self.client_auth_follower.get(self.follow)
+        self.client_auth_follower.get(self.follow)
+
+        self.assertEqual(Follow.objects.all().count(), 1)
+
+    def test_following_from_cache(self):
+        '''Кнопка подписки на профиле не обращается к таблице подписок'''
+        profile = reverse('posts:profile', args=['following'])
+        self.client_auth_follower.get(self.follow)
+        self.assertTrue(follows.is_following(self.user_follower.pk,
+                                             self.user_following.pk))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_auth_follower.get(profile)
+
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any('posts_follow' in query['sql']
+                             for query in queries.captured_queries))
+
+        self.client_auth_follower.get(self.unfollow)
+        response = self.client_auth_follower.get(profile)
+
+        self.assertFalse(response.context['following'])
+        self.assertEqual(
+            list(follows.following_ids(self.user_follower.pk)), [])
+
     def test_subscription_feed(self):
         '''запись появляется в ленте подписчиков'''
         Follow.objects.create(user=self.user_follower,
@@ -316,3 +608,52 @@ class FollowTests(TestCase):
 
         self.assertNotContains(response,
                                'Тестовая запись для тестирования ленты')
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(5)
+        ]
+        cls.detail = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_comments_are_paginated_oldest_first(self):
+        '''Комментарии выводятся страницами, начиная со старых'''
+        page = self.client.get(self.detail).context['comments']
+
+        self.assertEqual(list(page), self.comments[:3])
+
+        response = self.client.get(
+            self.detail, {'cursor': page.next_cursor})
+
+        self.assertEqual(list(response.context['comments']),
+                         self.comments[3:])
+
+    def test_comments_newest_first(self):
+        '''Параметр order=new выводит сначала новые комментарии'''
+        page = self.client.get(
+            self.detail, {'order': 'new'}).context['comments']
+
+        self.assertEqual(list(page), self.comments[:1:-1])
+
+        response = self.client.get(
+            self.detail, {'order': 'new', 'cursor': page.next_cursor})
+
+        self.assertEqual(list(response.context['comments']),
+                         self.comments[1::-1])
+
+    def test_post_detail_query_count(self):
+        '''Пост и комментарии с авторами загружаются двумя запросами'''
+        with self.assertNumQueries(2):
+            self.client.get(self.detail)
@@ -0,0 +1,93 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+THROTTLE_KEY = 'posts:throttle:{}:{}:{}'
+
+
+def _store():
+    # Общий кэш: лимит один на все процессы, а его файл не отнимает
+    # писателя у основной базы.
+    return caches['shared']
+
+
+def _keys(request, scope):
+    keys = {'ip': THROTTLE_KEY.format(
+        scope, 'ip', request.META.get('REMOTE_ADDR', ''))}
+    if request.user.is_authenticated:
+        keys['user'] = THROTTLE_KEY.format(scope, 'user', request.user.pk)
+    return keys
+
+
+def _take(store, key, now, interval, period):
+    """Списывает токен корзины key; возвращает ожидание в мс или 0.
+
+    Все величины — целые миллисекунды. Обычно это один атомарный incr.
+    """
+    try:
+        full_at = store.incr(key, interval)
+    except ValueError:
+        if store.add(key, now + interval, period // 1000):
+            return 0
+        full_at = store.incr(key, interval)
+    if full_at - interval < now:
+        # Корзина успела наполниться: отсчёт заново. Параллельный
+        # запрос может при этом не заплатить токен — на всплески
+        # это не влияет.
+        store.set(key, now + interval, period // 1000)
+        return 0
+    overflow = full_at - now - period
+    if overflow > 0:
+        store.decr(key, interval)
+        return overflow
+    if full_at - now > interval:
+        # incr не продлевает ключ: без этого корзина с долгом истекла бы
+        # раньше, чем наполнилась.
+        store.touch(key, math.ceil((full_at - now) / 1000))
+    return 0
+
+
+def consume(request, scope):
+    """Списывает токен из корзин пользователя и IP по алгоритму GCRA.
+
+    В кэше для каждой корзины лежит одно целое — время в мс, когда она
+    снова станет полной. Списание — incr, поэтому параллельные запросы
+    лимит не обходят. Если одна корзина переполнена, токены остальных
+    возвращаются. Возвращает, через сколько секунд можно повторить, или 0.
+    """
+    rates = settings.WRITE_THROTTLE_RATES[scope]
+    store = _store()
+    now = int(time.time() * 1000)
+    taken = []
+    for kind, key in _keys(request, scope).items():
+        limit, period = rates[kind]
+        interval = math.ceil(period * 1000 / limit)
+        wait = _take(store, key, now, interval, period * 1000)
+        if wait:
+            for key, interval in taken:
+                store.decr(key, interval)
+            return math.ceil(wait / 1000)
+        taken.append((key, interval))
+    return 0
+
+
+def throttle_writes(scope):
+    """Ограничивает частоту POST-запросов к view, отвечая 429."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'POST':
+                retry_after = consume(request, scope)
+                if retry_after:
+                    response = render(request, 'core/429.html',
+                                      {'retry_after': retry_after},
+                                      status=429)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import caching
+from .models import Post
+from .queries import post_scopes
+
+logger = logging.getLogger(__name__)
+
+ABSENT_KEY = 'posts:thumbnail:absent:{}:{}'
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+# Найденные миниатюры не меняются: новая картинка получает новое имя.
+_resolved = OrderedDict()
+_resolved_lock = threading.Lock()
+
+
+class LookupBackend(ThumbnailBackend):
+    """Вычисляет имя миниатюры так же, как sorl, но не создаёт её."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = LookupBackend()
+
+
+def _recall(keys):
+    found = {}
+    with _resolved_lock:
+        for key in keys:
+            if key in _resolved:
+                _resolved.move_to_end(key)
+                found[key] = _resolved[key]
+    return found
+
+
+def _remember(found):
+    with _resolved_lock:
+        _resolved.update(found)
+        for key in found:
+            _resolved.move_to_end(key)
+        while len(_resolved) > settings.THUMBNAIL_LRU_SIZE:
+            _resolved.popitem(last=False)
+
+
+def forget():
+    with _resolved_lock:
+        _resolved.clear()
+
+
+def stored_many(thumbnails):
+    """Готовые миниатюры: LRU процесса, один get_many и один запрос к БД.
+
+    Промах кэшируется на THUMBNAIL_MISS_TIMEOUT под поколением
+    'thumbnails': создав миниатюру, generate сдвигает его, и старые
+    промахи больше не читаются.
+    """
+    keys = [add_prefix(thumbnail.key) for thumbnail in thumbnails]
+    found = _recall(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        kvcache = default.kvstore.cache
+        version = caching.generations('thumbnails')['thumbnails']
+        absent_keys = {ABSENT_KEY.format(version, key): key
+                       for key in missing}
+        cached = kvcache.get_many([*missing, *absent_keys])
+        absent = {absent_keys[key] for key in cached if key in absent_keys}
+        values = {
+            key: value for key, value in cached.items()
+            if key not in absent_keys and isinstance(value, str)
+        }
+        rest = [key for key in missing
+                if key not in values and key not in absent]
+        if rest:
+            rows = dict(KVStore.objects.filter(key__in=rest).values_list(
+                'key', 'value'))
+            kvcache.set_many(rows, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            kvcache.set_many(
+                {ABSENT_KEY.format(version, key): True
+                 for key in rest if key not in rows},
+                settings.THUMBNAIL_MISS_TIMEOUT)
+            values.update(rows)
+        values = {key: deserialize_image_file(value)
+                  for key, value in values.items()}
+        _remember(values)
+        found.update(values)
+    return [found.get(key) for key in keys]
+
+
+def stored(thumbnail):
+    return stored_many([thumbnail])[0]
+
+
+def lookup_many(images, alias):
+    """Миниатюры для списка картинок; исходная, пока миниатюры нет."""
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    thumbnails = stored_many([
+        backend.thumbnail_file(image, geometry, **options)
+        for image in images
+    ])
+    return [thumbnail or image
+            for thumbnail, image in zip(thumbnails, images)]
+
+
+def lookup(image, alias):
+    """Готовая миниатюра или исходное изображение, пока её нет."""
+    return lookup_many([image], alias)[0]
+
+
+def generate(name):
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        default.backend.get_thumbnail(name, geometry, **options)
+    # Страницы с исходной картинкой вместо миниатюры пора пересобрать.
+    post_ids = Post.objects.filter(image=name).values_list('pk', flat=True)
+    caching.bump('thumbnails', *post_scopes(list(post_ids)))
+
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def queue(name):
+    if settings.THUMBNAIL_WORKERS == 0:
+        generate(name)
+        return True
+    with _lock:
+        for pending_name, future in list(_pending.items()):
+            if future.done():
+                del _pending[pending_name]
+        if name in _pending:
+            return True
+        if len(_pending) >= settings.THUMBNAIL_QUEUE_LIMIT:
+            return False
+        future = _executor_instance().submit(generate, name)
+        future.add_done_callback(_report_failure)
+        _pending[name] = future
+    return True
+
+
+def _report_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Не удалось создать миниатюры',
+                     exc_info=future.exception())
+
+
+def schedule(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: queue(name))
@@ -1,10 +1,220 @@
+import base64
+import binascii
+import json
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from core import sqlite
+
+from . import caching
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре полей без COUNT(*) и OFFSET."""
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.descending = descending
+
+    def encode_cursor(self, direction, obj):
+        if isinstance(obj, dict):
+            values = [obj[key] for key in self.keys]
+        else:
+            values = [getattr(obj, key) for key in self.keys]
+        raw = json.dumps([direction] + [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in values
+        ])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def to_python(self, key, value):
+        try:
+            field = self.object_list.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            # Аннотация вроде rank поиска: число из JSON как есть.
+            if not isinstance(value, (int, float)):
+                raise ValueError(key)
+            return value
+        return field.to_python(value)
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return NEXT, None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(raw.decode())
+            values = [self.to_python(key, value)
+                      for key, value in zip(self.keys, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return NEXT, None
+        if direction not in (NEXT, PREVIOUS) or len(values) != 2:
+            return NEXT, None
+        return direction, values
+
+    def window(self, direction, values):
+        """Строки страницы в порядке обхода, на одну больше per_page."""
+        first, second = self.keys
+        queryset = self.object_list
+        if self.descending == (direction == NEXT):
+            ordering = ('-' + first, '-' + second)
+            lookup = 'lt'
+        else:
+            ordering = (first, second)
+            lookup = 'gt'
+        if values is not None:
+            queryset = queryset.filter(
+                Q(**{f'{first}__{lookup}': values[0]})
+                | Q(**{first: values[0], f'{second}__{lookup}': values[1]})
+            )
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def cursor_page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor)
+        rows = list(self.window(direction, values))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not rows:
+                return self.cursor_page()
+            rows.reverse()
+        page = Page(rows, 1, self)
+        page.next_cursor = page.previous_cursor = None
+        if rows and (has_more if direction == NEXT else True):
+            page.next_cursor = self.encode_cursor(NEXT, rows[-1])
+        if rows and (values is not None if direction == NEXT else has_more):
+            page.previous_cursor = self.encode_cursor(PREVIOUS, rows[0])
+        return page
+
+
+class CountingPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждой странице.
+
+    Готовое число можно передать в count. Иначе число кэшируется до смены
+    поколения scope. Считается не больше PAGINATOR_ESTIMATE_FROM + 1
+    строк: если набор больше, approximate=True, count — эта нижняя
+    граница, а оценка из sqlite_stat1 идёт только в вывод «~N».
+    Страницы дальше границы открываются без проверки по count: пустая
+    страница считается несуществующей.
+    """
+
+    def __init__(self, object_list, per_page, count=None, scope=None,
+                 estimate_by=None):
+        super().__init__(object_list, per_page)
+        self.known_count = count
+        self.scope = scope
+        self.estimate_by = estimate_by
+        self.reached = 0
+
+    def estimate(self):
+        model = self.object_list.model
+        column = None
+        if self.estimate_by is not None:
+            column = model._meta.get_field(self.estimate_by).column
+        return sqlite.estimated_rows(connections[self.object_list.db],
+                                     model._meta.db_table, column)
+
+    def measure(self):
+        """(число, оценка или None): оценка нужна только большим наборам."""
+        limit = settings.PAGINATOR_ESTIMATE_FROM
+        bounded = self.object_list[:limit + 1].count()
+        if bounded <= limit:
+            return bounded, None
+        return bounded, max(self.estimate() or 0, bounded)
+
+    @cached_property
+    def measured(self):
+        if self.known_count is not None:
+            return self.known_count, None
+        if self.scope is None:
+            return self.object_list.count(), None
+        key = caching.count_key(self.scope, self.object_list)
+        measured = cache.get(key)
+        if measured is None:
+            measured = self.measure()
+            # Статистика SQLite устаревает, оценку держим недолго.
+            timeout = (settings.PAGINATOR_COUNT_TIMEOUT
+                       if measured[1] is None
+                       else settings.PAGINATOR_ESTIMATE_TIMEOUT)
+            cache.set(key, measured, timeout)
+        return measured
+
+    @property
+    def approximate(self):
+        return self.measured[1] is not None
+
+    @property
+    def display_count(self):
+        count, estimate = self.measured
+        return count if estimate is None else estimate
+
+    @cached_property
+    def count(self):
+        return self.measured[0]
+
+    @property
+    def num_pages(self):
+        pages = super().num_pages
+        if self.approximate:
+            return max(pages, self.reached)
+        return pages
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(
+                _('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        if not self.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        # Лишняя строка значит, что есть следующая страница.
+        self.reached = max(self.reached,
+                           number + (len(rows) > self.per_page))
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Пустая страница за границей подсчёта: последняя известная.
+            return self.page(self.num_pages)
+
 
+def page_paginator(queryset, request, keys=('pub_date', 'id'), **counting):
+    """Страница по курсору или, если передан ?page=, по номеру.
 
-def page_paginator(queryset, request):
+    counting уходит в CountingPaginator: count, scope, estimate_by.
+    """
     limit = settings.POSTS_PER_PAGE
-    paginator = Paginator(queryset, limit)
     page_number = request.GET.get('page')
+    if page_number is None:
+        paginator = CursorPaginator(queryset, limit, keys)
+        return paginator.cursor_page(request.GET.get('cursor'))
+    paginator = CountingPaginator(queryset, limit, **counting)
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,62 +1,111 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
+from . import export, follows, search, thumbnails
+from .caching import cache_page_by_generation, condition_by_generation
+from .counters import stats_for
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import page_paginator
+from .models import FeedEntry, Follow, Group, Post, User
+from .queries import post_comments, post_list
+from .throttle import throttle_writes
+from .utils import CursorPaginator, page_paginator
 
 
+# names меняется при переименовании групп и авторов: их имена и ссылки
+# на них есть в карточках постов.
+@condition_by_generation('all', 'names')
+@cache_page_by_generation('all', 'names')
 def index(request):
-    posts = Post.objects.select_related('group', 'author')
+    posts = post_list()
     context = {
-        'page_obj': page_paginator(posts, request),
+        'page_obj': page_paginator(posts, request, scope='count:all'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition_by_generation('group:{slug}', 'names')
+@cache_page_by_generation('group:{slug}', 'names')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group', 'author')
+    posts = post_list(group=group)
     context = {
         'group': group,
-        'page_obj': page_paginator(posts, request)
+        'page_obj': page_paginator(posts, request,
+                                   scope=f'count:group:{slug}',
+                                   estimate_by='group'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition_by_generation('author:{username}')
+@cache_page_by_generation('author:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group', 'author')
-    count = posts.count()
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author
-        ).exists()
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts = post_list(author=author)
+    stats = stats_for(author)
+    # На себя подписаться нельзя, запрос не нужен.
+    following = (request.user.is_authenticated
+                 and request.user != author
+                 and follows.is_following(request.user.pk, author.pk))
     context = {
-        'page_obj': page_paginator(posts, request),
+        'page_obj': page_paginator(posts, request,
+                                   count=stats.posts_count),
         'following': following,
-        'count': count,
+        'count': stats.posts_count,
+        'stats': stats,
         'author': author,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition_by_generation('post:{post_id}', 'names')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
+    order = 'new' if request.GET.get('order') == 'new' else 'old'
+    paginator = CursorPaginator(
+        post_comments(post.pk),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'id'),
+        descending=order == 'new',
+    )
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': paginator.cursor_page(request.GET.get('cursor')),
+        'order': order,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    posts = post_list()
+    group_slug = request.GET.get('group')
+    if group_slug:
+        posts = posts.filter(group__slug=group_slug)
+    author_name = request.GET.get('author')
+    if author_name:
+        posts = posts.filter(author__username=author_name)
+    paginator = CursorPaginator(
+        search.search(query, posts), settings.POSTS_PER_PAGE,
+        keys=('rank', 'id'), descending=False)
+    context = {
+        'query': query,
+        'groups': Group.objects.order_by('title'),
+        'page_obj': paginator.cursor_page(request.GET.get('cursor')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@throttle_writes('post')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -65,6 +114,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -79,11 +129,14 @@ def post_edit(request, post_id):
                     files=request.FILES or None, instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     return render(request, template, {"form": form, "post_edit_flag": True})
 
 
 @login_required
+@throttle_writes('comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -99,8 +152,11 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    context = {'page_obj': page_paginator(posts, request)}
+    entries = FeedEntry.objects.filter(user=request.user).select_related(
+        'post__author', 'post__group')
+    page_obj = page_paginator(entries, request, keys=('pub_date', 'post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj]
+    context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
@@ -108,16 +164,33 @@ def follow_index(request):
 def profile_follow(request, username):
     current_user = request.user
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=current_user, author=author)
-    if current_user != author and not following.exists():
-        Follow.objects.create(user=current_user, author=author)
+    if current_user != author:
+        try:
+            # Повторную подписку отсекает уникальный индекс.
+            with transaction.atomic():
+                Follow.objects.create(user=current_user, author=author)
+        except IntegrityError:
+            pass
     return redirect(reverse('posts:profile', args=[username]))
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=request.user, author=author)
-    if following.exists():
-        following.delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=author)
+
+
+@login_required
+def export_archive(request):
+    username = request.user.username
+    if request.GET.get('images'):
+        response = StreamingHttpResponse(
+            export.archive(request.user), content_type='application/zip')
+        filename = f'{username}.zip'
+    else:
+        response = StreamingHttpResponse(
+            export.jsonl(request.user), content_type='application/x-ndjson')
+        filename = f'{username}.jsonl'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
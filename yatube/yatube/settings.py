@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -6,6 +7,9 @@ SECRET_KEY = '$b%5p@w+v4^y)p#3&*+upf4(4(%4#q(k0u=nj8$a60@1f#9@r*'
 
 DEBUG = True
 
+# Боевой профиль: YATUBE_ENV=production.
+PRODUCTION = os.environ.get('YATUBE_ENV') == 'production'
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -18,6 +22,7 @@ INSTALLED_APPS = [
     'users',
     'core',
     'about',
+    'jobs',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -28,11 +33,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,9 +72,48 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60 if PRODUCTION else 0,
     }
 }
 
+# Боевые настройки SQLite; с ними же сравнивает sqlite_concurrency.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Выполняются на каждом новом соединении с основной базой SQLite.
+# journal_mode записывается в файл, поэтому вне боевого профиля — только
+# ожидание блокировки.
+SQLITE_PRAGMAS = (
+    SQLITE_PRODUCTION_PRAGMAS if PRODUCTION else {'busy_timeout': 5000})
+
+# Копии основной базы только для чтения, их обновляет refresh_replicas.
+SQLITE_REPLICAS = 0
+
+for number in range(1, SQLITE_REPLICAS + 1):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db-replica-{number}.sqlite3'),
+        'CONN_MAX_AGE': 60 if PRODUCTION else 0,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+READ_YOUR_WRITES_SECONDS = 5
+
+# Реплика старше этого не читается, запросы уходят в основную базу.
+REPLICA_MAX_LAG = 10
+
+REPLICA_REFRESH_INTERVAL = 2
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -98,6 +145,14 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POSTS_PER_PAGE = 10
 
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Сессию, удалённую при выходе в одном процессе, не должны отдавать
+# из своего кэша остальные.
+SESSION_CACHE_ALIAS = 'shared'
+
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -110,10 +165,127 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Файл общего кэша лежит вне репозитория; в бою путь задаёт окружение.
+SHARED_CACHE_PATH = os.environ.get(
+    'YATUBE_SHARED_CACHE',
+    os.path.join(tempfile.gettempdir(), 'yatube', 'shared-cache.sqlite3'))
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Поколения кэша страниц, сессии и пользователи: их должны видеть
+    # все процессы.
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': SHARED_CACHE_PATH,
+    },
 }
 
+TEST_RUNNER = 'core.testing.TestRunner'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+FEED_MAX_ENTRIES = 1000
+
+QUERY_STATS_HEADER = DEBUG
+
+# Превышение бюджета — warning в журнале. Ошибкой оно становится только
+# в тестах: их настройки включает core.testing.
+QUERY_BUDGET_STRICT = False
+
+# Наибольшее число запросов view в тестах плюс запас на ветки, которые
+# тесты не проходят: первый пост автора, группа, картинка.
+QUERY_BUDGETS = {
+    'posts:index': 7,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 6,
+    'posts:post_create': 14,
+    'posts:post_edit': 10,
+    'posts:add_comment': 8,
+    'posts:follow_index': 4,
+    'posts:profile_follow': 16,
+    'posts:profile_unfollow': 10,
+    'posts:search': 4,
+    'posts:export': 6,
+    'posts:api_posts': 3,
+    'posts:api_group_posts': 4,
+    'posts:api_profile_posts': 4,
+    'posts:api_post_detail': 3,
+    'posts:api_comments': 4,
+}
+
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 15
+
+PAGINATOR_COUNT_TIMEOUT = 60 * 60
+
+# С этого размера число записей берётся из статистики SQLite.
+PAGINATOR_ESTIMATE_FROM = 100_000
+
+PAGINATOR_ESTIMATE_TIMEOUT = 60
+
+ANONYMOUS_CACHE_FRESH_SECONDS = 30
+
+ANONYMOUS_CACHE_STALE_SECONDS = 60 * 60
+
+ANONYMOUS_CACHE_REFRESH_TIMEOUT = 30
+
+ANONYMOUS_CACHE_BACKGROUND_REFRESH = True
+
+ANONYMOUS_CACHE_REFRESH_WORKERS = 2
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Автор с большим числом подписчиков раскладывает пост по лентам
+# через очередь задач.
+FEED_INLINE_FAN_OUT = 10
+
+JOBS_BATCH_SIZE = 100
+
+JOBS_MAX_ATTEMPTS = 5
+
+# Задержка перед повтором удваивается с каждой попыткой.
+JOBS_RETRY_DELAY = 10
+
+JOBS_LOCK_TIMEOUT = 60 * 5
+
+JOBS_POLL_INTERVAL = 1
+
+# Лимиты записи: (число запросов, период в секундах) на пользователя и IP.
+WRITE_THROTTLE_RATES = {
+    'post': {'user': (10, 60 * 10), 'ip': (30, 60 * 10)},
+    'comment': {'user': (20, 60), 'ip': (60, 60)},
+}
+
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+POST_IMAGE_MAX_SIZE = 1920
+
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+POST_IMAGE_MAX_ANIMATED_BYTES = 5 * 1024 * 1024
+
+POST_IMAGE_FORMAT = 'WEBP'
+
+POST_IMAGE_QUALITY = 82
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_QUEUE_LIMIT = 100
+
+THUMBNAIL_LRU_SIZE = 10000
+
+THUMBNAIL_MISS_TIMEOUT = 60
+
+COMMENTS_PER_PAGE = 50
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+API_CHUNK_SIZE = 100
+
+EXPORT_CHUNK_SIZE = 500